@@ -0,0 +1,30 @@
+"""items keyset indexes
+
+Revision ID: 5c1f2a9d7e43
+Revises: 3897b21d725e
+Create Date: 2026-10-18 09:12:31.402718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f2a9d7e43'
+down_revision: Union[str, Sequence[str], None] = '3897b21d725e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_items_is_available_id', 'items', ['is_available', 'id'], unique=False)
+    op.create_index('ix_items_owner_id_id', 'items', ['owner_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_owner_id_id', table_name='items')
+    op.drop_index('ix_items_is_available_id', table_name='items')
@@ -0,0 +1,30 @@
+"""messages item_id set null on item delete
+
+Revision ID: a2c7e5d9b3f8
+Revises: f4b9c2e7a1d6
+Create Date: 2026-10-18 17:14:52.906133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c7e5d9b3f8'
+down_revision: Union[str, Sequence[str], None] = 'f4b9c2e7a1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('messages_item_id_fkey', 'messages', type_='foreignkey')
+    op.create_foreign_key('messages_item_id_fkey', 'messages', 'items', ['item_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('messages_item_id_fkey', 'messages', type_='foreignkey')
+    op.create_foreign_key('messages_item_id_fkey', 'messages', 'items', ['item_id'], ['id'])
@@ -0,0 +1,55 @@
+"""messages and conversations
+
+Revision ID: a7d3e6b2f1c8
+Revises: 5c1f2a9d7e43
+Create Date: 2026-10-18 10:41:07.118205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e6b2f1c8'
+down_revision: Union[str, Sequence[str], None] = '5c1f2a9d7e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('messages',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('sender_id', sa.UUID(), nullable=False),
+    sa.Column('recipient_id', sa.UUID(), nullable=False),
+    sa.Column('item_id', sa.UUID(), nullable=True),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+    sa.ForeignKeyConstraint(['recipient_id'], ['users.uuid'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.uuid'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_messages_sender_recipient_created', 'messages', ['sender_id', 'recipient_id', 'created_at', 'id'], unique=False)
+    op.create_table('conversations',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('peer_id', sa.UUID(), nullable=False),
+    sa.Column('last_message_id', sa.UUID(), nullable=False),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ),
+    sa.ForeignKeyConstraint(['peer_id'], ['users.uuid'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.uuid'], ),
+    sa.PrimaryKeyConstraint('user_id', 'peer_id')
+    )
+    op.create_index('ix_conversations_user_last_message', 'conversations', ['user_id', 'last_message_at', 'peer_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversations_user_last_message', table_name='conversations')
+    op.drop_table('conversations')
+    op.drop_index('ix_messages_sender_recipient_created', table_name='messages')
+    op.drop_table('messages')
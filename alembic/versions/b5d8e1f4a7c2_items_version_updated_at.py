@@ -0,0 +1,40 @@
+"""items version and updated_at
+
+Revision ID: b5d8e1f4a7c2
+Revises: f9a2c5e8b3d1
+Create Date: 2026-10-18 15:02:44.183605
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8e1f4a7c2'
+down_revision: Union[str, Sequence[str], None] = 'f9a2c5e8b3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('items', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('items', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.drop_index('ix_items_owner_id_id', table_name='items')
+    op.drop_index('ix_items_is_available_id', table_name='items')
+    op.create_index('ix_items_is_available_id', 'items', ['is_available', 'id'], unique=False, postgresql_include=['version', 'updated_at'])
+    op.create_index('ix_items_owner_id_id', 'items', ['owner_id', 'id'], unique=False, postgresql_include=['is_available', 'version', 'updated_at'])
+    op.create_index('ix_items_id_validators', 'items', ['id'], unique=False, postgresql_include=['is_available', 'version', 'updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_items_id_validators', table_name='items')
+    op.drop_index('ix_items_owner_id_id', table_name='items')
+    op.drop_index('ix_items_is_available_id', table_name='items')
+    op.create_index('ix_items_is_available_id', 'items', ['is_available', 'id'], unique=False)
+    op.create_index('ix_items_owner_id_id', 'items', ['owner_id', 'id'], unique=False)
+    op.drop_column('items', 'updated_at')
+    op.drop_column('items', 'version')
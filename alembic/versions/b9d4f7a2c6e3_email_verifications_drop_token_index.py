@@ -0,0 +1,28 @@
+"""email_verifications drop duplicate token index
+
+Revision ID: b9d4f7a2c6e3
+Revises: e7a2d5b8c1f4
+Create Date: 2026-10-18 23:12:41.630957
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4f7a2c6e3'
+down_revision: Union[str, Sequence[str], None] = 'e7a2d5b8c1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index(op.f('ix_email_verifications_token'), table_name='email_verifications')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_email_verifications_token'), 'email_verifications', ['token'], unique=False)
@@ -0,0 +1,40 @@
+"""item_images uploads
+
+Revision ID: c6e9b2d5f8a1
+Revises: a8c1e4f7b2d5
+Create Date: 2026-10-18 18:55:37.226148
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e9b2d5f8a1'
+down_revision: Union[str, Sequence[str], None] = 'a8c1e4f7b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('item_images', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.add_column('item_images', sa.Column('content_type', sa.String(), nullable=True))
+    op.add_column('item_images', sa.Column('thumbnail_url', sa.String(), nullable=True))
+    op.add_column('item_images', sa.Column('medium_url', sa.String(), nullable=True))
+    op.add_column('item_images', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_item_images_item_id_sha256', 'item_images', ['item_id', 'sha256'], unique=True)
+    op.create_index('ix_item_images_sha256', 'item_images', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_item_images_sha256', table_name='item_images')
+    op.drop_index('ix_item_images_item_id_sha256', table_name='item_images')
+    op.drop_column('item_images', 'created_at')
+    op.drop_column('item_images', 'medium_url')
+    op.drop_column('item_images', 'thumbnail_url')
+    op.drop_column('item_images', 'content_type')
+    op.drop_column('item_images', 'sha256')
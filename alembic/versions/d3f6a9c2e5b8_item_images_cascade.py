@@ -0,0 +1,30 @@
+"""item_images cascade on item delete
+
+Revision ID: d3f6a9c2e5b8
+Revises: b5d8e1f4a7c2
+Create Date: 2026-10-18 16:21:09.730412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f6a9c2e5b8'
+down_revision: Union[str, Sequence[str], None] = 'b5d8e1f4a7c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('item_images_item_id_fkey', 'item_images', type_='foreignkey')
+    op.create_foreign_key('item_images_item_id_fkey', 'item_images', 'items', ['item_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('item_images_item_id_fkey', 'item_images', type_='foreignkey')
+    op.create_foreign_key('item_images_item_id_fkey', 'item_images', 'items', ['item_id'], ['id'])
@@ -0,0 +1,30 @@
+"""swap_suggestions rejected_by
+
+Revision ID: d3f8a6c1e9b4
+Revises: b9d4f7a2c6e3
+Create Date: 2026-10-18 23:48:05.214377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a6c1e9b4'
+down_revision: Union[str, Sequence[str], None] = 'b9d4f7a2c6e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('swap_suggestions', sa.Column('rejected_by', sa.UUID(), nullable=True))
+    op.create_foreign_key('swap_suggestions_rejected_by_fkey', 'swap_suggestions', 'users', ['rejected_by'], ['uuid'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('swap_suggestions_rejected_by_fkey', 'swap_suggestions', type_='foreignkey')
+    op.drop_column('swap_suggestions', 'rejected_by')
@@ -0,0 +1,36 @@
+"""exchange requests workflow
+
+Revision ID: e2b7f4c9a1d3
+Revises: c4e8b1a9d2f6
+Create Date: 2026-10-18 12:05:19.667310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7f4c9a1d3'
+down_revision: Union[str, Sequence[str], None] = 'c4e8b1a9d2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('exchange_requests', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_exchange_requests_to_user_created', 'exchange_requests', ['to_user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_exchange_requests_from_user_created', 'exchange_requests', ['from_user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_exchange_requests_item_from_id', 'exchange_requests', ['item_from_id'], unique=False)
+    op.create_index('ix_exchange_requests_item_to_id', 'exchange_requests', ['item_to_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_exchange_requests_item_to_id', table_name='exchange_requests')
+    op.drop_index('ix_exchange_requests_item_from_id', table_name='exchange_requests')
+    op.drop_index('ix_exchange_requests_from_user_created', table_name='exchange_requests')
+    op.drop_index('ix_exchange_requests_to_user_created', table_name='exchange_requests')
+    op.drop_column('exchange_requests', 'created_at')
@@ -0,0 +1,28 @@
+"""users tokens_valid_after
+
+Revision ID: e7a2d5b8c1f4
+Revises: c6e9b2d5f8a1
+Create Date: 2026-10-18 21:47:09.518244
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2d5b8c1f4'
+down_revision: Union[str, Sequence[str], None] = 'c6e9b2d5f8a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('tokens_valid_after', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tokens_valid_after')
@@ -0,0 +1,34 @@
+"""exchange_requests cascade on item delete
+
+Revision ID: f4b9c2e7a1d6
+Revises: d3f8a6c1e9b4
+Create Date: 2026-10-18 17:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9c2e7a1d6'
+down_revision: Union[str, Sequence[str], None] = 'd3f8a6c1e9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('exchange_requests_item_from_id_fkey', 'exchange_requests', type_='foreignkey')
+    op.create_foreign_key('exchange_requests_item_from_id_fkey', 'exchange_requests', 'items', ['item_from_id'], ['id'], ondelete='CASCADE')
+    op.drop_constraint('exchange_requests_item_to_id_fkey', 'exchange_requests', type_='foreignkey')
+    op.create_foreign_key('exchange_requests_item_to_id_fkey', 'exchange_requests', 'items', ['item_to_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('exchange_requests_item_to_id_fkey', 'exchange_requests', type_='foreignkey')
+    op.create_foreign_key('exchange_requests_item_to_id_fkey', 'exchange_requests', 'items', ['item_to_id'], ['id'])
+    op.drop_constraint('exchange_requests_item_from_id_fkey', 'exchange_requests', type_='foreignkey')
+    op.create_foreign_key('exchange_requests_item_from_id_fkey', 'exchange_requests', 'items', ['item_from_id'], ['id'])
@@ -0,0 +1,63 @@
+"""wishlists and swap suggestions
+
+Revision ID: f9a2c5e8b3d1
+Revises: e2b7f4c9a1d3
+Create Date: 2026-10-18 13:48:02.551970
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9a2c5e8b3d1'
+down_revision: Union[str, Sequence[str], None] = 'e2b7f4c9a1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('wishlist_items',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('item_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.uuid'], ),
+    sa.PrimaryKeyConstraint('user_id', 'item_id')
+    )
+    op.create_index('ix_wishlist_items_item_id', 'wishlist_items', ['item_id'], unique=False)
+    op.create_table('swap_suggestions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'accepted', 'rejected', 'expired', name='swapstatus'), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_swap_suggestions_status', 'swap_suggestions', ['status'], unique=False)
+    op.create_table('swap_legs',
+    sa.Column('suggestion_id', sa.UUID(), nullable=False),
+    sa.Column('receiver_id', sa.UUID(), nullable=False),
+    sa.Column('giver_id', sa.UUID(), nullable=False),
+    sa.Column('item_id', sa.UUID(), nullable=False),
+    sa.Column('accepted', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['giver_id'], ['users.uuid'], ),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.uuid'], ),
+    sa.ForeignKeyConstraint(['suggestion_id'], ['swap_suggestions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('suggestion_id', 'receiver_id')
+    )
+    op.create_index('ix_swap_legs_receiver_id', 'swap_legs', ['receiver_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_swap_legs_receiver_id', table_name='swap_legs')
+    op.drop_table('swap_legs')
+    op.drop_index('ix_swap_suggestions_status', table_name='swap_suggestions')
+    op.drop_table('swap_suggestions')
+    op.drop_index('ix_wishlist_items_item_id', table_name='wishlist_items')
+    op.drop_table('wishlist_items')
+    sa.Enum(name='swapstatus').drop(op.get_bind(), checkfirst=True)
@@ -1,8 +1,45 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from api.routers import auth_router, item_router, chat_ws_router
+from fastapi.staticfiles import StaticFiles
+from api.core.config import Config
+from api.core.metrics import MetricsMiddleware
+from api.core.revocation import revocation_filter
+from api.routers import (
+    auth_router,
+    item_router,
+    chat_ws_router,
+    exchange_router,
+    swap_router,
+    metrics_router,
+)
+from api.routers.chat_router import manager
+from api.services.chat import message_writer
 
-api = FastAPI(title="StuffSwapper API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await message_writer.start()
+    await manager.start()
+    await revocation_filter.start()
+    yield
+    await revocation_filter.stop()
+    await manager.stop()
+    # flush buffered chat messages before the process exits
+    await message_writer.stop()
+
+
+api = FastAPI(title="StuffSwapper API", lifespan=lifespan)
+
+if Config.METRICS_ENABLED:
+    api.add_middleware(MetricsMiddleware)
 
 api.include_router(auth_router, tags=["Auth"])
 api.include_router(item_router, tags=["Items"])
 api.include_router(chat_ws_router, tags=["Chat"])
+api.include_router(exchange_router, tags=["Exchanges"])
+api.include_router(swap_router, tags=["Swaps"])
+if Config.METRICS_ENABLED:
+    api.include_router(metrics_router, tags=["Metrics"])
+
+# uploaded images; in production a CDN or the reverse proxy serves MEDIA_ROOT
+api.mount("/media", StaticFiles(directory=Config.MEDIA_ROOT, check_dir=False))
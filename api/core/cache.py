@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import json
+from api.core.metrics import Counter
+from api.database.redis import redis
+
+
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "Read-through cache lookups by outcome",
+    ("cache", "result"),
+)
+
+# Version and payload in one round-trip. The payload key embeds the version,
+# so bumping the version orphans every entry of that scope at once and the
+# stale ones simply age out through their TTL.
+_GET_VERSIONED = redis.register_script(
+    """
+    local version = redis.call('GET', KEYS[1]) or '0'
+    return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+    """
+)
+
+
+class LocalLRU:
+    """Tiny per-process LRU with a short TTL, consulted before Redis."""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ReadThroughCache:
+    """JSON values in Redis, invalidated by bumping per-scope version counters.
+
+    A scope is whatever a write can affect ("all", "owner:<id>", ...). Reads
+    name the scope they depend on; writes bump every scope they touch.
+    Concurrent misses for the same key in this process share one load.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: int,
+        local_size: int = 0,
+        local_ttl: float = 1.0,
+    ):
+        self.name = name
+        self.ttl = ttl
+        # cross-process staleness of the local tier is bounded by local_ttl
+        self.local = LocalLRU(local_size, local_ttl) if local_size > 0 else None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._hits_local = cache_requests_total.labels(name, "hit_local")
+        self._hits = cache_requests_total.labels(name, "hit")
+        self._misses = cache_requests_total.labels(name, "miss")
+
+    def _version_key(self, scope: str) -> str:
+        return f"cache:{self.name}:ver:{scope}"
+
+    async def get_or_load(
+        self, scope: str, key: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        local_key = f"{scope}|{key}"
+        if self.local is not None:
+            value = self.local.get(local_key)
+            if value is not None:
+                self._hits_local.inc()
+                return value
+
+        prefix = f"cache:{self.name}:{scope}:"
+        version, payload = await _GET_VERSIONED(
+            keys=[self._version_key(scope)], args=[prefix, f":{key}"]
+        )
+        if payload is not None:
+            self._hits.inc()
+            value = json.loads(payload)
+            if self.local is not None:
+                self.local.set(local_key, value)
+            return value
+
+        self._misses.inc()
+        redis_key = f"{prefix}{version}:{key}"
+        inflight = self._inflight.get(redis_key)
+        if inflight is not None:
+            # asyncio.wait leaves the shared load running if this caller is
+            # cancelled; if the loading caller was cancelled, load ourselves
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                return inflight.result()
+            return await self.get_or_load(scope, key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        # nobody may be waiting on it, don't warn about an unread exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[redis_key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            del self._inflight[redis_key]
+
+        # the version was read before loading, so a write that lands in
+        # between bumps past this key and it is never served
+        await redis.set(redis_key, json.dumps(value), ex=self.ttl)
+        if self.local is not None:
+            self.local.set(local_key, value)
+        return value
+
+    async def bump(self, *scopes: str, client=None):
+        # client: for callers outside the app's event loop (Celery tasks)
+        if not scopes:
+            return
+        async with (client or redis).pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.incr(self._version_key(scope))
+            await pipe.execute()
+        if self.local is not None:
+            # writes are rare next to reads; dropping everything is simplest
+            self.local.clear()
@@ -5,16 +5,46 @@ from datetime import timezone
 celery_app = Celery(
     "stuffswapper",
     broker=f"{Config.REDIS_URL}/0",
-    backend=f"{Config.REDIS_URL}/1",
+    include=[
+        "api.tasks.send_email",
+        "api.tasks.swap_matching",
+        "api.tasks.images",
+        "api.tasks.verification",
+    ],
 )
 
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
-    result_serializer="json",
+    # nothing reads task results; don't write one per email to Redis
+    task_ignore_result=True,
     timezone=timezone.utc,
     enable_utc=True,
     worker_concurrency=4,
     task_soft_time_limit=30,
     task_time_limit=60,
+    # the matcher keeps its graph in process memory between runs, so it gets
+    # its own single-process worker (see docker-compose)
+    task_routes={
+        "api.tasks.swap_matching.*": {"queue": "matching"},
+        # threads pool: many tasks share one process-wide SMTP pool and loop
+        "api.tasks.send_email.*": {"queue": "email"},
+    },
+    beat_schedule={
+        "find-trade-cycles": {
+            "task": "api.tasks.swap_matching.find_trade_cycles",
+            "schedule": Config.SWAP_MATCHING_INTERVAL_SECONDS,
+        },
+        "dispatch-email-outbox": {
+            "task": "api.tasks.send_email.dispatch_outbox",
+            "schedule": Config.OUTBOX_POLL_INTERVAL_SECONDS,
+            # a missed tick is covered by the next one, don't let them pile up
+            "options": {"expires": Config.OUTBOX_POLL_INTERVAL_SECONDS},
+        },
+        # only has work in table mode, and then only the rows that piled up
+        "purge-verification-tokens": {
+            "task": "api.tasks.verification.purge_verification_tokens",
+            "schedule": Config.VERIFICATION_PURGE_INTERVAL_SECONDS,
+        },
+    },
 )
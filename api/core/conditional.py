@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request
+from typing import Iterable, Optional
+from hashlib import sha1
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def resource_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def collection_etag(members: Iterable[tuple[object, int]], has_next: bool) -> str:
+    # membership, every member's version and whether more pages follow;
+    # anything that changes the JSON body changes one of these
+    digest = sha1()
+    for item_id, version in members:
+        digest.update(f"{item_id}:{version};".encode())
+    digest.update(b"+" if has_next else b".")
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse_etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _as_utc(value: datetime) -> datetime:
+    # "-0000" (RFC 2822's "unknown zone") parses to a naive datetime, which
+    # can't be compared with an aware one; HTTP dates are always GMT
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def is_conditional(request: Request) -> bool:
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[str]
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # weak comparison; If-Modified-Since is ignored when this is present
+        tags = [tag.removeprefix("W/") for tag in _parse_etags(if_none_match)]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(parsedate_to_datetime(last_modified)) <= since
+    return False
+
+
+def if_match_versions(request: Request) -> Optional[list[int]]:
+    """Versions an If-Match header accepts; None means "any" (absent or *)."""
+    header = request.headers.get("if-match")
+    if header is None:
+        return None
+
+    tags = _parse_etags(header)
+    if "*" in tags:
+        return None
+
+    # strong comparison: weak or foreign tags simply never match
+    versions = []
+    for tag in tags:
+        value = tag[1:-1] if len(tag) > 2 and tag[0] == tag[-1] == '"' else ""
+        if value.isdigit():
+            versions.append(int(value))
+    return versions
+
+
+def validator_headers(etag: str, last_modified: Optional[str]) -> dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
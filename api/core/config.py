@@ -1,17 +1,43 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Literal
 
 
 class Settings(BaseSettings):
     # DB
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # transaction-pooling PgBouncer can't keep prepared statements per connection
+    DB_PGBOUNCER_MODE: bool = False
 
     # JWT
     JWT_SECRET: str
     JWT_ALGORITHM: str
     TOKEN_EXPIRE_MINUTES: int
 
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+
     # REDIS
     REDIS_URL: str
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300
+    # full reload of the local revocation filter, on top of pub/sub updates
+    REVOCATION_RESYNC_SECONDS: float = 60
+    # in-process principals, dropped on change events from any node; the TTL
+    # only bounds how long a delayed event can leave one stale
+    PRINCIPAL_LOCAL_SIZE: int = 10000
+    PRINCIPAL_LOCAL_TTL_SECONDS: float = 5.0
+    ITEM_CACHE_TTL_SECONDS: int = 60
+    # in-process tier in front of Redis, off by default; entries may lag
+    # writes made through other processes by up to its TTL
+    ITEM_CACHE_LOCAL_SIZE: int = 0
+    ITEM_CACHE_LOCAL_TTL_SECONDS: float = 1.0
 
     # Mailer
     MAIL_USERNAME: str
@@ -21,12 +47,72 @@ class Settings(BaseSettings):
     MAIL_SERVER: str
     MAIL_TLS: bool
     MAIL_SSL: bool
+    # pooled delivery in the email worker
+    MAIL_POOL_SIZE: int = 4
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_PER_CONNECTION: int = 100
+    # provider send limit across the process's connections, 0 = unlimited
+    MAIL_RATE_PER_SECOND: float = 0
+    MAIL_IDLE_CHECK_SECONDS: float = 30
+    MAIL_SEND_TIMEOUT: float = 30
+    # transactional outbox, drained by the email worker
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 8
 
     VERIFICATION_TOKEN_EXPIRE_HOURS: int
     RESEND_LIMIT_PER_HOUR: int
+    # "table": one email_verifications row per token. "signed": HMAC-signed,
+    # self-expiring tokens; only a short-lived Redis key records their use
+    VERIFICATION_TOKEN_MODE: Literal["table", "signed"] = "table"
+    VERIFICATION_PURGE_INTERVAL_SECONDS: int = 3600
+    VERIFICATION_PURGE_BATCH_SIZE: int = 1000
+
+    # Rate limits, "<count>/<second|minute|hour|day>"; a count of 0 disables one
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_IP: str = "20/minute"
+    RATE_LIMIT_LOGIN_EMAIL: str = "10/minute"
+    RATE_LIMIT_REGISTER_IP: str = "10/hour"
+    RATE_LIMIT_WS_CONNECT_IP: str = "30/minute"
+    RATE_LIMIT_WS_MESSAGES_USER: str = "20/second"
 
     FRONTEND_URL: str
 
+    # Media
+    MEDIA_ROOT: str = "media"
+    # prefix for stored files in API responses; point at a CDN in production
+    MEDIA_BASE_URL: str = "/media"
+    MAX_IMAGE_BYTES: int = 10 * 1024 * 1024
+
+    # Chat persistence
+    CHAT_FLUSH_BATCH_SIZE: int = 500
+    CHAT_FLUSH_INTERVAL_MS: int = 200
+    CHAT_WRITE_BUFFER_SIZE: int = 10000
+    CHAT_MESSAGE_MAX_LENGTH: int = 4000
+
+    # Swap matching
+    SWAP_MATCHING_INTERVAL_SECONDS: int = 60
+    SWAP_MAX_CYCLE_LENGTH: int = 4
+    # DFS expansions allowed per start node, keeps dense hubs from stalling a run
+    SWAP_SEARCH_BUDGET: int = 2000
+    SWAP_FULL_REBUILD_EVERY: int = 60
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+    # per-query SQL and Redis timing; off keeps only the cheap route metrics
+    METRICS_DETAILED: bool = False
+
+    # Pagination
+    ITEMS_PAGE_SIZE: int = 50
+    ITEMS_PAGE_SIZE_MAX: int = 200
+    ITEMS_EXPORT_CHUNK_SIZE: int = 1000
+    ITEMS_IMPORT_BATCH_SIZE: int = 1000
+    ITEMS_IMPORT_MAX_ERRORS: int = 1000
+    # a single NDJSON line longer than this is rejected, not buffered
+    ITEMS_IMPORT_MAX_LINE_BYTES: int = 65536
+    CHAT_PAGE_SIZE: int = 50
+    CHAT_PAGE_SIZE_MAX: int = 200
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
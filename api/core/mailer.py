@@ -0,0 +1,254 @@
+from aiosmtplib import SMTP, SMTPException, SMTPServerDisconnected
+from concurrent.futures import Future
+from email.message import EmailMessage
+from time import monotonic
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import os
+import threading
+from api.core.config import Config
+
+T = TypeVar("T")
+
+
+def build_message(recipients: list[str], subject: str, html: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = Config.MAIL_FROM
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+class RateLimiter:
+    """Token bucket shared by every connection of a dispatcher; rate 0 = off."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class PooledConnection:
+    def __init__(self, dispatcher: "MailDispatcher"):
+        self.dispatcher = dispatcher
+        self.smtp: Optional[SMTP] = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    async def ensure(self):
+        d = self.dispatcher
+        if self.smtp is not None and self.smtp.is_connected:
+            # providers cap messages per session; roll over before they do
+            if self.sent >= d.max_per_connection:
+                await self.close()
+            elif monotonic() - self.last_used > d.idle_check_seconds:
+                try:
+                    await self.smtp.noop()
+                except (SMTPException, OSError):
+                    await self.close()
+
+        if self.smtp is None or not self.smtp.is_connected:
+            self.smtp = SMTP(
+                hostname=d.hostname,
+                port=d.port,
+                username=d.username,
+                password=d.password,
+                use_tls=d.use_tls,
+                start_tls=d.start_tls,
+                timeout=d.timeout,
+            )
+            await self.smtp.connect()
+            self.sent = 0
+
+    async def send(self, message: EmailMessage):
+        await self.smtp.send_message(message)
+        self.sent += 1
+        self.last_used = monotonic()
+
+    async def close(self):
+        if self.smtp is None:
+            return
+        try:
+            await self.smtp.quit()
+        except (SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+
+
+class MailDispatcher:
+    """A few persistent SMTP sessions fed from one queue.
+
+    Each connection drains up to batch_size queued messages per wake-up and
+    sends them back to back on the same session, so a burst pays for one
+    handshake per connection instead of one per email.
+    """
+
+    def __init__(
+        self,
+        hostname: str = Config.MAIL_SERVER,
+        port: int = Config.MAIL_PORT,
+        username: Optional[str] = Config.MAIL_USERNAME,
+        password: Optional[str] = Config.MAIL_PASSWORD,
+        use_tls: bool = Config.MAIL_SSL,
+        start_tls: bool = Config.MAIL_TLS,
+        pool_size: int = Config.MAIL_POOL_SIZE,
+        batch_size: int = Config.MAIL_BATCH_SIZE,
+        max_per_connection: int = Config.MAIL_MAX_PER_CONNECTION,
+        rate_per_second: float = Config.MAIL_RATE_PER_SECOND,
+        idle_check_seconds: float = Config.MAIL_IDLE_CHECK_SECONDS,
+        timeout: float = Config.MAIL_SEND_TIMEOUT,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_per_connection = max_per_connection
+        self.idle_check_seconds = idle_check_seconds
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_per_second, burst=pool_size)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._connections: list[PooledConnection] = []
+
+    async def start(self):
+        for _ in range(self.pool_size):
+            connection = PooledConnection(self)
+            self._connections.append(connection)
+            self._workers.append(asyncio.create_task(self._run(connection)))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await asyncio.gather(
+            *(c.close() for c in self._connections), return_exceptions=True
+        )
+        self._workers.clear()
+        self._connections.clear()
+
+    async def send(self, message: EmailMessage):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        await future
+
+    async def _run(self, connection: PooledConnection):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            for index, (message, future) in enumerate(batch):
+                if future.done():
+                    # the caller timed out and will retry on its own
+                    continue
+                try:
+                    # no I/O unless the session is new, stale or used up
+                    await connection.ensure()
+                except Exception as e:
+                    # can't reach the server (or can't even set up a session):
+                    # fail the rest, the tasks retry
+                    for _, pending in batch[index:]:
+                        if not pending.done():
+                            pending.set_exception(e)
+                    await connection.close()
+                    break
+
+                try:
+                    await self.limiter.acquire()
+                    await connection.send(message)
+                except SMTPServerDisconnected as e:
+                    # the session is gone; whatever is left goes back in line
+                    if not future.done():
+                        future.set_exception(e)
+                    await connection.close()
+                    for item in batch[index + 1 :]:
+                        self._queue.put_nowait(item)
+                    break
+                except (SMTPException, OSError) as e:
+                    # refused recipient and the like, the session is still fine
+                    if not future.done():
+                        future.set_exception(e)
+                except Exception as e:
+                    # anything else fails this message, never the worker; the
+                    # session is in an unknown state, so start a fresh one
+                    if not future.done():
+                        future.set_exception(e)
+                    await connection.close()
+                else:
+                    if not future.done():
+                        future.set_result(None)
+
+
+# One long-lived loop per worker process, shared by all of its task threads.
+# Created lazily so prefork children each get their own after the fork.
+_lock = threading.Lock()
+_state: dict = {"pid": None, "loop": None, "dispatcher": None}
+
+
+def _process_dispatcher() -> tuple[asyncio.AbstractEventLoop, MailDispatcher]:
+    with _lock:
+        if _state["pid"] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="mail-dispatcher", daemon=True
+            ).start()
+
+            async def create():
+                dispatcher = MailDispatcher()
+                await dispatcher.start()
+                return dispatcher
+
+            dispatcher = asyncio.run_coroutine_threadsafe(create(), loop).result()
+            _state.update(pid=os.getpid(), loop=loop, dispatcher=dispatcher)
+        return _state["loop"], _state["dispatcher"]
+
+
+def run_in_mail_loop(
+    make_coro: Callable[[MailDispatcher], Awaitable[T]],
+    timeout: Optional[float] = None,
+) -> T:
+    """Run a coroutine on this process's mail loop and block for its result."""
+    loop, dispatcher = _process_dispatcher()
+    future: Future = asyncio.run_coroutine_threadsafe(make_coro(dispatcher), loop)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def deliver(message: EmailMessage, timeout: float = Config.MAIL_SEND_TIMEOUT):
+    """Blocking send through this process's pooled dispatcher."""
+    run_in_mail_loop(lambda dispatcher: dispatcher.send(message), timeout)
+
+
+def shutdown():
+    with _lock:
+        if _state["pid"] != os.getpid():
+            return
+        loop, dispatcher = _state["loop"], _state["dispatcher"]
+        asyncio.run_coroutine_threadsafe(dispatcher.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        _state.update(pid=None, loop=None, dispatcher=None)
@@ -0,0 +1,300 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Optional
+from sqlalchemy import event
+from api.core.config import Config
+
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple, object] = {}
+        registry.register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+            for values, child in self._children.items()
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        # callback gauges are read at scrape time, nothing to update on hot paths
+        self.callback = callback
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def render(self) -> list[str]:
+        if self.callback is not None:
+            return [f"{self.name} {self.callback()}"]
+        return super().render()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # last slot is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def snapshot(self) -> dict:
+        return self.labels().snapshot()
+
+    def render(self) -> list[str]:
+        lines = []
+        for values, child in self._children.items():
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{labels} {snapshot['count']}")
+        return lines
+
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time"
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+db_query_seconds_per_request = Histogram(
+    "db_query_seconds_per_request", "Total SQL time per HTTP request"
+)
+redis_command_duration_seconds = Histogram(
+    "redis_command_duration_seconds", "Redis helper latency", ("operation",)
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# set by MetricsMiddleware, mutated by the SQLAlchemy event hooks
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, avoids the per-request cost of BaseHTTPMiddleware."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats() if Config.METRICS_DETAILED else None
+        token = request_stats.set(stats)
+        http_requests_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            http_requests_in_flight.dec()
+            request_stats.reset(token)
+
+            # templated path keeps label cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_duration_seconds.labels(
+                scope["method"], path, status_code
+            ).observe(elapsed)
+
+            if stats is not None:
+                db_queries_per_request.observe(stats.queries)
+                db_query_seconds_per_request.observe(stats.query_seconds)
+
+
+def instrument_engine(engine):
+    # The start time rides on the statement's own execution context rather
+    # than a per-connection stack: a statement that fails never reaches
+    # after_cursor_execute, and a stack entry left behind would skew every
+    # later timing on that pooled connection.
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        context._query_start = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = perf_counter() - context._query_start
+        db_query_duration_seconds.observe(elapsed)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+
+def timed_redis(func):
+    # decided once at import, so the low-overhead mode pays nothing here
+    if not Config.METRICS_DETAILED:
+        return func
+
+    histogram = redis_command_duration_seconds.labels(func.__name__)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(perf_counter() - start)
+
+    return wrapper
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from fastapi import WebSocketException, status
+from fastapi.exceptions import HTTPException
+from starlette.requests import HTTPConnection
+from math import ceil
+from api.core.config import Config
+from api.core.metrics import Counter
+from api.database.redis import redis
+
+
+rate_limited_total = Counter(
+    "rate_limited_total",
+    "Requests and websocket messages rejected by a rate limit",
+    ("limit",),
+)
+
+# Sliding window counter over every key in one atomic call. Each key keeps a
+# counter per fixed window; the previous window's count is weighted by how
+# much of it still overlaps the sliding window. Nothing is counted unless all
+# keys have room, and the clock is Redis', so app nodes can't disagree.
+# ARGV = cost, then limit and window (ms) per key. Returns {0, 0} when
+# allowed, otherwise the milliseconds until the tightest key would have room
+# and that key's (1-based) position.
+_SLIDING_WINDOW = redis.register_script(
+    """
+    local time = redis.call('TIME')
+    local now = time[1] * 1000 + math.floor(time[2] / 1000)
+    local cost = tonumber(ARGV[1])
+    local wait, blocked = 0, 0
+    local counters = {}
+    for i, key in ipairs(KEYS) do
+        local limit = tonumber(ARGV[2 * i])
+        local window = tonumber(ARGV[2 * i + 1])
+        local index = math.floor(now / window)
+        local elapsed = now - index * window
+        local counter = key .. ':' .. index
+        local current = tonumber(redis.call('GET', counter)) or 0
+        local previous = tonumber(redis.call('GET', key .. ':' .. (index - 1))) or 0
+        if previous * (window - elapsed) / window + current + cost > limit then
+            -- wait for enough of the older count to slide out of the window
+            local needed
+            if current + cost <= limit then
+                needed = window * (1 - (limit - current - cost) / previous) - elapsed
+            elseif cost <= limit then
+                -- into the next window, where this one becomes the previous
+                needed = window - elapsed + window * (1 - (limit - cost) / current)
+            else
+                needed = 2 * window
+            end
+            needed = math.ceil(needed)
+            needed = math.max(needed, 1)
+            if needed > wait then
+                wait, blocked = needed, i
+            end
+        end
+        counters[i] = {counter, window}
+    end
+    if wait > 0 then
+        return {wait, blocked}
+    end
+    for _, entry in ipairs(counters) do
+        redis.call('INCRBY', entry[1], cost)
+        redis.call('PEXPIRE', entry[1], entry[2] * 2)
+    end
+    return {0, 0}
+    """
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    name: str
+    limit: int
+    window: float
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        # "<count>/<second|minute|hour|day>", e.g. "20/minute"
+        count, _, period = spec.partition("/")
+        return cls(name, int(count), _PERIODS[period.strip().rstrip("s")])
+
+    @property
+    def enabled(self) -> bool:
+        return Config.RATE_LIMIT_ENABLED and self.limit > 0
+
+
+LOGIN_PER_IP = RateLimit.parse("login_ip", Config.RATE_LIMIT_LOGIN_IP)
+LOGIN_PER_EMAIL = RateLimit.parse("login_email", Config.RATE_LIMIT_LOGIN_EMAIL)
+REGISTER_PER_IP = RateLimit.parse("register_ip", Config.RATE_LIMIT_REGISTER_IP)
+RESEND_PER_USER = RateLimit("resend_user", Config.RESEND_LIMIT_PER_HOUR, 3600)
+WS_CONNECT_PER_IP = RateLimit.parse("ws_connect_ip", Config.RATE_LIMIT_WS_CONNECT_IP)
+WS_MESSAGES_PER_USER = RateLimit.parse(
+    "ws_messages_user", Config.RATE_LIMIT_WS_MESSAGES_USER
+)
+
+
+async def hit(*checks: tuple[RateLimit, str], cost: int = 1) -> float:
+    """Count one request against every (limit, identity) pair.
+
+    Returns 0 if it's allowed, otherwise the seconds to wait; a rejected
+    request isn't counted against any of the limits.
+    """
+    checks = tuple((limit, identity) for limit, identity in checks if limit.enabled)
+    if not checks:
+        return 0
+
+    args = [cost]
+    for limit, _ in checks:
+        args += [limit.limit, int(limit.window * 1000)]
+    wait_ms, blocked = await _SLIDING_WINDOW(
+        keys=[f"ratelimit:{limit.name}:{identity}" for limit, identity in checks],
+        args=args,
+    )
+    if wait_ms:
+        rate_limited_total.labels(checks[blocked - 1][0].name).inc()
+    return wait_ms / 1000
+
+
+async def enforce(
+    *checks: tuple[RateLimit, str], detail: str = "Too many requests. Try later."
+):
+    retry_after = await hit(*checks)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(ceil(retry_after))},
+        )
+
+
+def client_ip(connection: HTTPConnection) -> str:
+    # behind a proxy this relies on uvicorn's --proxy-headers
+    return connection.client.host if connection.client else "unknown"
+
+
+def limit_by_ip(limit: RateLimit):
+    """Dependency enforcing `limit` per client IP, for routes and websockets."""
+
+    async def dependency(connection: HTTPConnection):
+        if connection.scope["type"] != "websocket":
+            await enforce((limit, client_ip(connection)))
+        elif await hit((limit, client_ip(connection))):
+            raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    return dependency
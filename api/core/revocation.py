@@ -0,0 +1,151 @@
+from redis.asyncio.client import PubSub
+from time import time
+from typing import Optional
+import asyncio
+import logging
+from api.core.cache import LocalLRU
+from api.core.config import Config
+from api.core.metrics import Counter
+from api.database.redis import (
+    BLOCKLIST_CHANNEL,
+    PRINCIPAL_CHANNEL,
+    add_jti_to_blocklist,
+    get_blocklist_snapshot,
+    redis,
+)
+
+
+revocation_checks_total = Counter(
+    "revocation_checks_total",
+    "Local revocation filter lookups by outcome",
+    ("result",),
+)
+
+
+class RevocationFilter:
+    """In-process copy of the token blocklist, plus recently seen principals.
+
+    Loaded from the blocklist index on startup, then kept current through
+    the blocklist pub/sub channel and a periodic resync that also covers
+    events missed while the subscription was down. A jti that isn't here
+    has not been revoked; a hit is still confirmed against Redis by the
+    caller.
+
+    Principals are kept for a few seconds and dropped as soon as any node
+    bumps their generation, so a request with an unrevoked token and a
+    known principal never touches Redis.
+    """
+
+    def __init__(
+        self,
+        resync_seconds: float = Config.REVOCATION_RESYNC_SECONDS,
+        principal_size: int = Config.PRINCIPAL_LOCAL_SIZE,
+        principal_ttl: float = Config.PRINCIPAL_LOCAL_TTL_SECONDS,
+    ):
+        self.resync_seconds = resync_seconds
+        self.revoked: dict[str, int] = {}
+        self.principals = LocalLRU(principal_size, principal_ttl)
+        # bumped on every principal change; see remember_principal
+        self.principal_events = 0
+        self.ready = False
+        self.pub: Optional[PubSub] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        # subscribe before the snapshot so nothing revoked in between is lost
+        self.pub = redis.pubsub(ignore_subscribe_messages=True)
+        await self.pub.subscribe(BLOCKLIST_CHANNEL, PRINCIPAL_CHANNEL)
+        await self.resync()
+        self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        self.ready = False
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self.pub:
+            await self.pub.aclose()
+
+    async def resync(self):
+        self.revoked = await get_blocklist_snapshot()
+        self.ready = True
+
+    def add(self, jti: str, exp: int):
+        self.revoked[jti] = exp
+
+    def might_be_revoked(self, jti: str) -> bool:
+        # not loaded (or lost track): fall back to asking Redis every time
+        if not self.ready:
+            revocation_checks_total.labels("unsynced").inc()
+            return True
+
+        exp = self.revoked.get(jti)
+        if exp is None:
+            revocation_checks_total.labels("miss").inc()
+            return False
+        if exp < time():
+            del self.revoked[jti]
+            revocation_checks_total.labels("miss").inc()
+            return False
+        revocation_checks_total.labels("hit").inc()
+        return True
+
+    def get_principal(self, user_id: str) -> Optional[dict]:
+        # only trusted while the subscription is keeping it current
+        if not self.ready:
+            return None
+        return self.principals.get(user_id)
+
+    def remember_principal(self, user_id: str, principal: dict, seen: int):
+        # `seen` is principal_events from before the Redis or database read;
+        # if a change arrived since, what was read may already be stale
+        if self.ready and seen == self.principal_events:
+            self.principals.set(user_id, principal)
+
+    def forget_principal(self, user_id: str):
+        self.principal_events += 1
+        self.principals.discard(user_id)
+
+    def forget_principals(self):
+        self.principal_events += 1
+        self.principals.clear()
+
+    async def listen(self):
+        next_resync = asyncio.get_running_loop().time() + self.resync_seconds
+        while True:
+            try:
+                if asyncio.get_running_loop().time() >= next_resync:
+                    # also drops entries whose tokens have expired since
+                    await self.resync()
+                    next_resync += self.resync_seconds
+                raw = await self.pub.get_message(timeout=1.0)  # type: ignore
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("revocation listener failed, resyncing")
+                # events may have been missed, check Redis until resynced
+                self.ready = False
+                self.forget_principals()
+                next_resync = asyncio.get_running_loop().time()
+                await asyncio.sleep(1)
+                continue
+
+            if not raw or raw["type"] != "message":
+                continue
+            if raw["channel"] == PRINCIPAL_CHANNEL:
+                self.forget_principal(raw["data"])
+            else:
+                jti, _, exp = raw["data"].partition(" ")
+                self.add(jti, int(exp))
+
+
+revocation_filter = RevocationFilter()
+
+
+async def revoke_token(jti: str, exp: int):
+    await add_jti_to_blocklist(jti, exp)
+    # visible on this node right away, the pub/sub echo is a no-op
+    revocation_filter.add(jti, exp)
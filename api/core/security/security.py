@@ -1,12 +1,17 @@
 from typing import Optional
-from fastapi import Depends, Request, status
+from fastapi import Depends, Request, WebSocket, WebSocketException, status
 from fastapi.exceptions import HTTPException
 from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer
-from api.database import get_session
+from starlette.datastructures import State
+from api.database import get_session, async_session
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.database.redis import token_is_in_blocklist
+from api.database.models import User
+from api.database.redis import get_token_state, cache_principal
+from api.core.cache import cache_requests_total
 from api.core.config import Config
+from api.core.revocation import revocation_filter
 from datetime import datetime, timedelta
+from time import time
 from uuid import uuid4
 import jwt
 import logging
@@ -22,6 +27,8 @@ def create_token(
         payload={
             "user_data": user_data,
             "exp": datetime.now() + expiry,
+            # compared with the user's tokens_valid_after, so sub-second
+            "iat": time(),
             "jti": str(uuid4()),
             "refresh": refresh,
         },
@@ -41,6 +48,12 @@ def decode_token(token: str):
         return None
 
 
+_principal_lookups = {
+    result: cache_requests_total.labels("principal", result)
+    for result in ("hit_local", "hit", "miss")
+}
+
+
 class TokenBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super().__init__(auto_error=auto_error)
@@ -58,7 +71,12 @@ class TokenBearer(HTTPBearer):
                 status_code=status.HTTP_403_FORBIDDEN, detail="Not authenticated"
             )
 
-        token_data = decode_token(auth_credentials.credentials)
+        return await self.authenticate(
+            auth_credentials.credentials, request.state, session
+        )
+
+    async def authenticate(self, token: str, state: State, session: AsyncSession):
+        token_data = decode_token(token)
 
         # If token data is missing -> token has been expired or invalid
         if not token_data:
@@ -70,25 +88,72 @@ class TokenBearer(HTTPBearer):
                 },
             )
 
-        # If token is revoked
-        if await token_is_in_blocklist(token_data["jti"]):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail={
-                    "message": "Invalid or revoked token",
-                    "resolution": "Get a new token",
-                },
+        user_id = token_data["user_data"]["sub"]
+        jti = token_data["jti"]
+        # Redis only confirms what the local filter already suspects, and is
+        # skipped altogether while this node knows the user's principal
+        check_blocklist = revocation_filter.might_be_revoked(jti)
+        principal = revocation_filter.get_principal(user_id)
+        if principal is None or check_blocklist:
+            seen = revocation_filter.principal_events
+            revoked, principal, generation = await get_token_state(
+                jti, user_id, check_blocklist=check_blocklist
             )
 
+            # If token is revoked
+            if revoked:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail={
+                        "message": "Invalid or revoked token",
+                        "resolution": "Get a new token",
+                    },
+                )
+
+            # Cache miss -> load the user once and hand it to the route
+            if principal is None and self.auth_service:
+                _principal_lookups["miss"].inc()
+                user = await self.auth_service.get_user_by_id(user_id, session)
+                if user:
+                    state.user = user
+                    principal = {
+                        "is_active": user.is_active,
+                        "is_verified": user.is_verified,
+                        "valid_after": (
+                            user.tokens_valid_after.timestamp()
+                            if user.tokens_valid_after
+                            else 0
+                        ),
+                    }
+                    # skipped if the user was written since the state read
+                    if await cache_principal(user_id, generation, **principal):
+                        revocation_filter.remember_principal(
+                            user_id, principal, seen
+                        )
+            elif principal is not None:
+                _principal_lookups["hit"].inc()
+                revocation_filter.remember_principal(user_id, principal, seen)
+        else:
+            _principal_lookups["hit_local"].inc()
+
         if self.auth_service:
-            user_id = token_data["user_data"]["sub"]
-            user = await self.auth_service.get_user_by_id(user_id, session)
-            if not user or not user.is_active:
+            if not principal or not principal["is_active"]:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Account is deactivated or not found",
                 )
 
+            # Issued before the user's last logout-all or deactivation
+            if token_data.get("iat", 0) < principal["valid_after"]:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail={
+                        "message": "Invalid or revoked token",
+                        "resolution": "Get a new token",
+                    },
+                )
+            token_data["principal"] = principal
+
         if datetime.fromtimestamp(token_data["exp"]) < datetime.now():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -120,3 +185,49 @@ class RefreshTokenBearer(TokenBearer):
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Please provide a refresh token",
             )
+
+
+class WebSocketAccessTokenBearer(AccessTokenBearer):
+    # Browsers can't set headers on a websocket handshake, so accept ?token= too
+    async def __call__(self, websocket: WebSocket):
+        token = websocket.query_params.get("token")
+        if not token:
+            scheme, _, credentials = websocket.headers.get(
+                "authorization", ""
+            ).partition(" ")
+            if scheme.lower() == "bearer":
+                token = credentials
+
+        if not token:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+        # Short-lived session: a yield dependency would pin a pooled
+        # connection for the whole lifetime of the socket
+        async with async_session() as session:
+            try:
+                return await self.authenticate(token, websocket.state, session)
+            except HTTPException:
+                raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+
+access_token_bearer = AccessTokenBearer()
+
+
+async def get_authenticated_user(
+    request: Request,
+    access_token_data=Depends(access_token_bearer),
+    session: AsyncSession = Depends(get_session),
+) -> User:
+    # Reuse the user TokenBearer loaded on a principal cache miss
+    user = getattr(request.state, "user", None)
+    if user is None:
+        user = await AuthService().get_user_by_id(
+            access_token_data["user_data"]["sub"], session
+        )
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+
+    return user
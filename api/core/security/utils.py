@@ -1,7 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import status
+from fastapi.exceptions import HTTPException
 from passlib.context import CryptContext
+from api.core.config import Config
+import asyncio
 
 
-pwd_context = CryptContext(schemes=["bcrypt"])
+# Pinning min/max to the configured cost makes verify_and_update() flag
+# hashes made with any other cost for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash"
+)
+_hash_pending = 0
 
 
 def hash_password(password: str) -> str:
@@ -10,3 +28,35 @@ def hash_password(password: str) -> str:
 
 def verify_password(password, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
+
+
+async def _run_in_hash_pool(func, *args):
+    global _hash_pending
+
+    # Shed load instead of queueing unbounded work behind a login burst
+    if _hash_pending >= Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+
+async def verify_password_async(
+    password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    # Returns (valid, new_hash); new_hash is set when BCRYPT_ROUNDS changed
+    return await _run_in_hash_pool(
+        pwd_context.verify_and_update, password, hashed_password
+    )
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from fastapi import UploadFile
+from hashlib import sha256
+from pathlib import Path
+from PIL import Image, ImageOps
+from typing import Optional
+import asyncio
+import os
+import tempfile
+from api.core.config import Config
+
+
+# (extension, content type) by leading magic bytes; the client's
+# Content-Type header is never trusted
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+)
+
+# name -> longest edge in pixels, rendered by the process_image task
+IMAGE_VARIANTS = {"thumbnail": 256, "medium": 1024}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UnsupportedImage(Exception):
+    pass
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredImage:
+    sha256: str
+    extension: str
+    content_type: str
+    url: str
+
+
+def sniff_image(head: bytes) -> Optional[tuple[str, str]]:
+    for signature, extension, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return extension, content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return None
+
+
+def media_root() -> Path:
+    return Path(Config.MEDIA_ROOT)
+
+
+def original_path(digest: str, extension: str) -> Path:
+    # fan out by hash prefix so no directory grows unbounded
+    return media_root() / "originals" / digest[:2] / f"{digest}.{extension}"
+
+
+def variant_path(digest: str, name: str) -> Path:
+    return media_root() / "variants" / digest[:2] / f"{digest}_{name}.webp"
+
+
+def media_url(path: Path) -> str:
+    relative = path.relative_to(media_root()).as_posix()
+    return f"{Config.MEDIA_BASE_URL.rstrip('/')}/{relative}"
+
+
+async def store_upload(upload: UploadFile) -> StoredImage:
+    """Copy an upload into content-addressed storage, chunk by chunk.
+
+    The file is hashed while it is written to a temp file next to its final
+    place, then renamed into originals/<sha256>. Identical uploads end up as
+    the same file, so a duplicate costs one rename onto itself.
+    """
+    head = await upload.read(CHUNK_SIZE)
+    kind = sniff_image(head)
+    if kind is None:
+        raise UnsupportedImage()
+    extension, content_type = kind
+
+    staging = media_root() / "tmp"
+    await asyncio.to_thread(staging.mkdir, parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=staging)
+    digest, size = sha256(), 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > Config.MAX_IMAGE_BYTES:
+                    raise ImageTooLarge()
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+                chunk = await upload.read(CHUNK_SIZE)
+
+        path = original_path(digest.hexdigest(), extension)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(os.replace, temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+    return StoredImage(digest.hexdigest(), extension, content_type, media_url(path))
+
+
+def render_variants(digest: str, extension: str) -> dict[str, str]:
+    """Write the resized variants of an original; returns name -> URL.
+
+    CPU-bound, meant for the Celery worker.
+    """
+    source = original_path(digest, extension)
+    urls = {}
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        for name, edge in IMAGE_VARIANTS.items():
+            path = variant_path(digest, name)
+            urls[name] = media_url(path)
+            if path.exists():
+                # content-addressed: someone already rendered these bytes
+                continue
+
+            variant = original.copy()
+            variant.thumbnail((edge, edge))
+            if variant.mode not in ("RGB", "RGBA"):
+                variant = variant.convert("RGBA")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, "wb") as f:
+                variant.save(f, format="WEBP", quality=82)
+            os.replace(temp_name, path)
+    return urls
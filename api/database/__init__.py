@@ -1 +1 @@
-from .main import Base, get_session, async_session
+from .main import Base, get_session, async_session, pool_status
@@ -1,12 +1,78 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from api.core.config import Config
+from api.core.metrics import Gauge, Histogram, instrument_engine
+from time import perf_counter
+from uuid import uuid4
 
-async_engine = create_async_engine(Config.DATABASE_URL)
-async_session = async_sessionmaker(async_engine)
+
+pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection"
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # time spent waiting for a connection, including overflow connects
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait_seconds.observe(perf_counter() - start)
+
+
+def _connect_args() -> dict:
+    if Config.DB_PGBOUNCER_MODE:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # unique names so statements never collide across server connections
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE}
+
+
+async_engine = create_async_engine(
+    Config.DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_timeout=Config.DB_POOL_TIMEOUT,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    pool_pre_ping=Config.DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
+async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+if Config.METRICS_DETAILED:
+    instrument_engine(async_engine.sync_engine)
 Base = declarative_base()
 
 
+def pool_status() -> dict:
+    pool = async_engine.sync_engine.pool
+    return {
+        "size": pool.size(),  # type: ignore
+        "checked_in": pool.checkedin(),  # type: ignore
+        "checked_out": pool.checkedout(),  # type: ignore
+        "overflow": pool.overflow(),  # type: ignore
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "wait_seconds": pool_wait_seconds.snapshot(),
+    }
+
+
+Gauge(
+    "db_pool_checked_out",
+    "Pooled connections currently checked out",
+    callback=lambda: pool_status()["checked_out"],
+)
+Gauge(
+    "db_pool_overflow",
+    "Overflow connections currently open",
+    callback=lambda: pool_status()["overflow"],
+)
+
+
 async def get_session():
     async with async_session() as session:
         try:
@@ -1,8 +1,22 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, Boolean, DateTime, UUID, func, Text
+from sqlalchemy import (
+    Enum,
+    ForeignKey,
+    String,
+    Boolean,
+    DateTime,
+    UUID,
+    func,
+    Text,
+    Index,
+    Integer,
+    Computed,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from api.database import Base
 from uuid import uuid4, UUID as UID
 from datetime import datetime
+import enum
 
 
 class User(Base):
@@ -22,6 +36,10 @@ class User(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=func.now(), onupdate=func.now()
     )
+    # tokens issued (iat) before this are rejected: logout-all and deactivation
+    tokens_valid_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     email_verifications: Mapped[list["EmailVerification"]] = relationship(
         "EmailVerification",
@@ -34,8 +52,9 @@ class User(Base):
 class EmailVerification(Base):
     __tablename__ = "email_verifications"
 
+    # the primary key is the only index token needs
     token: Mapped[str] = mapped_column(
-        String, primary_key=True, index=True
+        String, primary_key=True
     )  # store as string (uuid4 hex)
     user_id: Mapped[UID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.uuid", ondelete="CASCADE"), nullable=False
@@ -51,35 +70,130 @@ class EmailVerification(Base):
     user: Mapped["User"] = relationship("User", back_populates="email_verifications")
 
 
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_next_attempt_at", "next_attempt_at"),)
+
+    id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    recipients: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=False)
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # keyset pagination: filter prefix + id as the stable sort key; the
+        # included columns let ETag checks run as index-only scans
+        Index(
+            "ix_items_is_available_id",
+            "is_available",
+            "id",
+            postgresql_include=["version", "updated_at"],
+        ),
+        Index(
+            "ix_items_owner_id_id",
+            "owner_id",
+            "id",
+            postgresql_include=["is_available", "version", "updated_at"],
+        ),
+        Index(
+            "ix_items_id_validators",
+            "id",
+            postgresql_include=["is_available", "version", "updated_at"],
+        ),
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_items_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
     owner_id: Mapped[UID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.uuid"))
     is_available: Mapped[bool] = mapped_column(Boolean, default=True)
+    # bumped by every UPDATE of the row; doubles as the item's ETag
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     owner = relationship("User", back_populates="items")
+    # bulk DELETE ... RETURNING never loads images, the FK cascade removes them
     images = relationship(
-        "ItemImage", back_populates="item", cascade="all, delete-orphan"
+        "ItemImage",
+        back_populates="item",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
 class ItemImage(Base):
     __tablename__ = "item_images"
+    __table_args__ = (
+        # the same bytes attach to an item once; variants are found by hash
+        Index("ix_item_images_item_id_sha256", "item_id", "sha256", unique=True),
+        Index("ix_item_images_sha256", "sha256"),
+    )
 
     id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     item_id: Mapped[UID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("items.id"), nullable=False
+        UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False
     )
     image_url: Mapped[str] = mapped_column(String, nullable=False)
+    # null on rows from before uploads were content-addressed
+    sha256: Mapped[str] = mapped_column(String(64), nullable=True)
+    content_type: Mapped[str] = mapped_column(String, nullable=True)
+    # filled in by the process_image task
+    thumbnail_url: Mapped[str] = mapped_column(String, nullable=True)
+    medium_url: Mapped[str] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
 
     item = relationship("Item", back_populates="images")
 
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index(
+            "ix_messages_sender_recipient_created",
+            "sender_id",
+            "recipient_id",
+            "created_at",
+            "id",
+        ),
+    )
+
     id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     sender_id: Mapped[UID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False
@@ -87,8 +201,9 @@ class Message(Base):
     recipient_id: Mapped[UID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False
     )
+    # the message outlives the item it mentioned
     item_id: Mapped[UID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("items.id"), nullable=True
+        UUID(as_uuid=True), ForeignKey("items.id", ondelete="SET NULL"), nullable=True
     )
     content: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
@@ -98,3 +213,148 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id])
     recipient = relationship("User", foreign_keys=[recipient_id])
     item = relationship("Item", foreign_keys=[item_id])
+
+
+class Conversation(Base):
+    # One row per (user, peer), maintained on message flush so the inbox
+    # never has to scan messages
+    __tablename__ = "conversations"
+    __table_args__ = (
+        Index(
+            "ix_conversations_user_last_message",
+            "user_id",
+            "last_message_at",
+            "peer_id",
+        ),
+    )
+
+    user_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True
+    )
+    peer_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True
+    )
+    last_message_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("messages.id"), nullable=False
+    )
+    last_message_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    unread_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    last_message = relationship("Message", foreign_keys=[last_message_id])
+
+
+class ExchangeStatus(str, enum.Enum):
+    pending = "pending"
+    accepted = "accepted"
+    rejected = "rejected"
+    cancelled = "cancelled"
+
+
+class ExchangeRequest(Base):
+    __tablename__ = "exchange_requests"
+    __table_args__ = (
+        Index("ix_exchange_requests_to_user_created", "to_user_id", "created_at", "id"),
+        Index(
+            "ix_exchange_requests_from_user_created", "from_user_id", "created_at", "id"
+        ),
+        Index("ix_exchange_requests_item_from_id", "item_from_id"),
+        Index("ix_exchange_requests_item_to_id", "item_to_id"),
+    )
+
+    id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    from_user_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False
+    )
+    to_user_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False
+    )
+    item_from_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False
+    )
+    item_to_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False
+    )
+    status: Mapped[ExchangeStatus] = mapped_column(
+        Enum(ExchangeStatus, name="exchangestatus"),
+        default=ExchangeStatus.pending,
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    item_from = relationship("Item", foreign_keys=[item_from_id])
+    item_to = relationship("Item", foreign_keys=[item_to_id])
+
+
+class WishlistItem(Base):
+    __tablename__ = "wishlist_items"
+    __table_args__ = (Index("ix_wishlist_items_item_id", "item_id"),)
+
+    user_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True
+    )
+    item_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("items.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class SwapStatus(str, enum.Enum):
+    pending = "pending"
+    accepted = "accepted"
+    rejected = "rejected"
+    expired = "expired"
+
+
+class SwapSuggestion(Base):
+    # A trade cycle found by the matching job; executes once every leg accepts
+    __tablename__ = "swap_suggestions"
+    __table_args__ = (Index("ix_swap_suggestions_status", "status"),)
+
+    id: Mapped[UID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    status: Mapped[SwapStatus] = mapped_column(
+        Enum(SwapStatus, name="swapstatus"), default=SwapStatus.pending, nullable=False
+    )
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    # a rejected cycle (its legs) is never suggested again
+    rejected_by: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=True
+    )
+
+    legs: Mapped[list["SwapLeg"]] = relationship(
+        "SwapLeg", back_populates="suggestion", cascade="all, delete-orphan"
+    )
+
+
+class SwapLeg(Base):
+    # giver hands item to receiver
+    __tablename__ = "swap_legs"
+    __table_args__ = (Index("ix_swap_legs_receiver_id", "receiver_id"),)
+
+    suggestion_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("swap_suggestions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    receiver_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), primary_key=True
+    )
+    giver_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False
+    )
+    item_id: Mapped[UID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False
+    )
+    accepted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    suggestion = relationship("SwapSuggestion", back_populates="legs")
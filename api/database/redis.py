@@ -1,27 +1,217 @@
 from redis.asyncio import from_url
+from time import time
+import json
 from api.core.config import Config
+from api.core.metrics import timed_redis
 
 
 redis = from_url(url=Config.REDIS_URL, decode_responses=True)
 
 
-async def add_jti_to_blocklist(jti: str) -> None:
-    await redis.set(name=jti, value="", ex=Config.TOKEN_EXPIRE_MINUTES)
+BLOCKLIST_PREFIX = "blocklist:jti:"
+# jti -> token exp, the catch-up snapshot a node loads on startup
+BLOCKLIST_INDEX = "blocklist:index"
+BLOCKLIST_CHANNEL = "blocklist:events"
 
 
-async def token_is_in_blocklist(jti: str) -> bool:
-    return await redis.get(jti) is not None
+@timed_redis
+async def add_jti_to_blocklist(jti: str, exp: int) -> None:
+    # kept until the token's own expiry; past that it's rejected anyway
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.set(name=BLOCKLIST_PREFIX + jti, value="", exat=exp)
+        pipe.zadd(BLOCKLIST_INDEX, {jti: exp})
+        pipe.zremrangebyscore(BLOCKLIST_INDEX, "-inf", int(time()))
+        pipe.publish(BLOCKLIST_CHANNEL, f"{jti} {exp}")
+        await pipe.execute()
 
 
-async def increment_resend_count(user_id: str) -> int:
-    key = f"verif_resend:{user_id}"
-    count = await redis.incr(key)
-    if count == 1:
-        await redis.expire(key, 3600)
-    return count
+@timed_redis
+async def get_blocklist_snapshot() -> dict[str, int]:
+    entries = await redis.zrangebyscore(
+        BLOCKLIST_INDEX, int(time()), "+inf", withscores=True
+    )
+    return {jti: int(exp) for jti, exp in entries}
 
 
-async def get_resend_count(user_id: str) -> int:
-    key = f"verif_resend:{user_id}"
-    v = await redis.get(key)
-    return int(v) if v else 0
+# user_id, whenever a user's principal changes; nodes drop their local copy
+PRINCIPAL_CHANNEL = "principal:events"
+
+
+def _principal_key(user_id: str) -> str:
+    return f"principal:{user_id}"
+
+
+def _principal_generation_key(user_id: str) -> str:
+    # bumped by every write that changes what the principal cache holds
+    return f"principal_gen:{user_id}"
+
+
+# Fill the principal cache only if its generation is still the one the loader
+# saw before reading the user. A loader whose SELECT ran before a write
+# committed would otherwise put the old row back after the write dropped it,
+# and keep a deactivated account usable for the whole TTL.
+_CACHE_PRINCIPAL = redis.register_script(
+    """
+    if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+        return 0
+    end
+    redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+    """
+)
+
+
+def _parse_principal(principal: dict) -> dict | None:
+    if not principal:
+        return None
+    return {
+        "is_active": principal["is_active"] == "1",
+        "is_verified": principal["is_verified"] == "1",
+        "valid_after": float(principal.get("valid_after") or 0),
+    }
+
+
+@timed_redis
+async def get_token_state(
+    jti: str, user_id: str, check_blocklist: bool = True
+) -> tuple[bool, dict | None, str]:
+    """Blocklist check, cached principal and its generation, one round-trip.
+
+    The generation only matters on a cache miss: pass it back to
+    cache_principal so a load that raced a write isn't cached.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        if check_blocklist:
+            pipe.exists(BLOCKLIST_PREFIX + jti)
+        pipe.hgetall(_principal_key(user_id))
+        pipe.get(_principal_generation_key(user_id))
+        *revoked, principal, generation = await pipe.execute()
+
+    return any(revoked), _parse_principal(principal), generation or "0"
+
+
+def _principal_fields(is_active: bool, is_verified: bool, valid_after: float):
+    return {
+        "is_active": int(is_active),
+        "is_verified": int(is_verified),
+        "valid_after": valid_after,
+    }
+
+
+@timed_redis
+async def cache_principal(
+    user_id: str,
+    generation: str,
+    is_active: bool,
+    is_verified: bool,
+    valid_after: float = 0,
+) -> bool:
+    fields = _principal_fields(is_active, is_verified, valid_after)
+    return bool(
+        await _CACHE_PRINCIPAL(
+            keys=[_principal_key(user_id), _principal_generation_key(user_id)],
+            args=[
+                generation,
+                Config.PRINCIPAL_CACHE_TTL_SECONDS,
+                *(part for pair in fields.items() for part in pair),
+            ],
+        )
+    )
+
+
+def _bump_principal_generation(pipe, user_id: str):
+    key = _principal_generation_key(user_id)
+    pipe.incr(key)
+    # outlives any load that could have started before the bump
+    pipe.expire(key, Config.PRINCIPAL_CACHE_TTL_SECONDS)
+    pipe.publish(PRINCIPAL_CHANNEL, user_id)
+
+
+@timed_redis
+async def invalidate_principal(user_id: str) -> None:
+    # call after the write commits; the next miss reloads the new row
+    async with redis.pipeline(transaction=True) as pipe:
+        _bump_principal_generation(pipe, user_id)
+        pipe.delete(_principal_key(user_id))
+        await pipe.execute()
+
+
+def _sessions_key(user_id: str) -> str:
+    return f"sessions:{user_id}"
+
+
+SESSIONS_REVOKED_CHANNEL = "sessions:revoked"
+
+
+@timed_redis
+async def record_session(user_id: str, sid: str, info: dict, expires_at: int) -> None:
+    # sid -> JSON; refresh tokens share one lifetime, so the newest session
+    # always expires last and the hash goes with it
+    key = _sessions_key(user_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, sid, json.dumps({**info, "expires_at": expires_at}))
+        pipe.expireat(key, expires_at)
+        await pipe.execute()
+
+
+@timed_redis
+async def get_sessions(user_id: str) -> list[dict]:
+    key = _sessions_key(user_id)
+    sessions = {
+        sid: json.loads(info) for sid, info in (await redis.hgetall(key)).items()
+    }
+    now = time()
+    expired = [sid for sid, info in sessions.items() if info["expires_at"] < now]
+    if expired:
+        await redis.hdel(key, *expired)
+    return [
+        {"sid": sid, **info}
+        for sid, info in sessions.items()
+        if info["expires_at"] >= now
+    ]
+
+
+@timed_redis
+async def revoke_user_sessions(
+    user_id: str, is_active: bool, is_verified: bool, valid_after: float
+) -> None:
+    """Publish a new token epoch for a user in one round-trip.
+
+    Call after the write commits. The principal cache gets the new epoch
+    right away and the generation is bumped with it, so a cache miss that
+    loaded the old row can't write it back over the new one (see
+    cache_principal). The session listing is cleared and every node is
+    told to close the user's chat sockets.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        key = _principal_key(user_id)
+        _bump_principal_generation(pipe, user_id)
+        pipe.hset(key, mapping=_principal_fields(is_active, is_verified, valid_after))
+        pipe.expire(key, Config.PRINCIPAL_CACHE_TTL_SECONDS)
+        pipe.delete(_sessions_key(user_id))
+        pipe.publish(SESSIONS_REVOKED_CHANNEL, user_id)
+        await pipe.execute()
+
+
+@timed_redis
+async def claim_verification_token(token: str, expires_at: int) -> bool:
+    # True for the first caller only; gone once the token would have expired
+    return bool(
+        await redis.set(f"verif_used:{token}", "", nx=True, exat=expires_at)
+    )
+
+
+SWAP_DIRTY_USERS = "swap:dirty_users"
+SWAP_DIRTY_ITEMS = "swap:dirty_items"
+
+
+@timed_redis
+async def mark_swap_dirty(user_ids=(), item_ids=()) -> None:
+    # picked up by the next incremental run of the swap matching job
+    async with redis.pipeline(transaction=False) as pipe:
+        if user_ids:
+            pipe.sadd(SWAP_DIRTY_USERS, *map(str, user_ids))
+        if item_ids:
+            pipe.sadd(SWAP_DIRTY_ITEMS, *map(str, item_ids))
+        await pipe.execute()
@@ -1,3 +1,6 @@
 from .auth_router import auth_router
 from .item_router import item_router
 from .chat_router import chat_ws_router
+from .exchange_router import exchange_router
+from .swap_router import swap_router
+from .metrics_router import metrics_router
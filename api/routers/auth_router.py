@@ -1,77 +1,109 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
-from api.core.config import Config
 from api.services import AuthService
+from api.services.auth import RegistrationConflict
 from api.database import get_session
-from api.schemas import UserCreate, UserRead, UserLogin
+from api.schemas import UserCreate, UserRead, UserLogin, SessionRead
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.core.security.utils import verify_password
+from api.core.security.utils import verify_password_async
 from api.core.security.security import (
     create_token,
     AccessTokenBearer,
     RefreshTokenBearer,
+    get_authenticated_user,
 )
-from datetime import timedelta
-from api.database.redis import (
-    add_jti_to_blocklist,
-    get_resend_count,
-    increment_resend_count,
+from api.database.models import User
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from api.core.revocation import revoke_token
+from api.core.ratelimit import (
+    LOGIN_PER_EMAIL,
+    LOGIN_PER_IP,
+    REGISTER_PER_IP,
+    RESEND_PER_USER,
+    client_ip,
+    enforce,
+    limit_by_ip,
 )
+from api.database.redis import get_sessions, record_session
 from api.services.verification import (
     create_verification_for_user,
     verify_token_and_activate,
-    send_verification_email_bg,
 )
 
 auth_router = APIRouter(prefix="/auth")
+REFRESH_TOKEN_EXPIRY = timedelta(days=7)
 auth_service = AuthService()
 
 
 @auth_router.post(
-    "/register", response_model=UserRead, status_code=status.HTTP_201_CREATED
+    "/register",
+    response_model=UserRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_ip(REGISTER_PER_IP))],
 )
 async def register_user(
     data: UserCreate,
     session: AsyncSession = Depends(get_session),
 ):
-    email_existing = await auth_service.get_user_by_email(data.email, session)
-    if email_existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Email already taken"
-        )
-
-    username_existing = await auth_service.get_user_by_username(data.username, session)
-    if username_existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="username unavailable"
-        )
-
     if data.password1 != data.password2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Password don't match"
         )
 
-    new_user = await auth_service.create_user(data, session)
-
-    verification_token = await create_verification_for_user(str(new_user.uuid))
-    send_verification_email_bg(new_user.email, verification_token.token)
+    try:
+        new_user = await auth_service.register_user(data, session)
+    except RegistrationConflict as e:
+        detail = "Email already taken" if e.field == "email" else "username unavailable"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
     return new_user
 
 
 @auth_router.post("/login", status_code=status.HTTP_200_OK)
-async def login_user(data: UserLogin, session: AsyncSession = Depends(get_session)):
+async def login_user(
+    data: UserLogin, request: Request, session: AsyncSession = Depends(get_session)
+):
+    # before any bcrypt work; per email too, against spraying one account
+    await enforce(
+        (LOGIN_PER_IP, client_ip(request)),
+        (LOGIN_PER_EMAIL, data.email.lower()),
+    )
+
     user = await auth_service.get_user_by_email(data.email, session)
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid email or password"
+        )
+
+    valid, new_hash = await verify_password_async(data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid email or password"
         )
 
-    user_data = {"sub": str(user.uuid)}
+    # Cost factor changed since this hash was made -> upgrade it transparently
+    if new_hash:
+        await auth_service.update_password_hash(user, new_hash, session)
+
+    # sid ties the tokens of one login together for the session listing
+    user_data = {"sub": str(user.uuid), "sid": str(uuid4())}
 
     access_token = create_token(user_data)
-    refresh_token = create_token(user_data, expiry=timedelta(days=7), refresh=True)
+    refresh_token = create_token(user_data, expiry=REFRESH_TOKEN_EXPIRY, refresh=True)
+
+    now = datetime.now(tz=timezone.utc)
+    await record_session(
+        user_data["sub"],
+        user_data["sid"],
+        {
+            "created_at": now.isoformat(),
+            "user_agent": request.headers.get("user-agent"),
+            "ip": request.client.host if request.client else None,
+        },
+        int((now + REFRESH_TOKEN_EXPIRY).timestamp()),
+    )
 
     return {
         "access_token": access_token,
@@ -82,35 +114,49 @@ async def login_user(data: UserLogin, session: AsyncSession = Depends(get_sessio
 
 @auth_router.get("/refresh-token", status_code=status.HTTP_200_OK)
 async def refresh_token(refresh_token_data=Depends(RefreshTokenBearer())):
-    user_id = refresh_token_data["user_data"]["sub"]
-    user_data = {"sub": user_id}
-    access_token = create_token(user_data)
+    user_data = refresh_token_data["user_data"]
+    access_token = create_token({"sub": user_data["sub"], "sid": user_data.get("sid")})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @auth_router.get("/logout")
 async def logout_user(access_token_data=Depends(AccessTokenBearer())):
-    jti = access_token_data["jti"]
-    await add_jti_to_blocklist(jti)
+    await revoke_token(access_token_data["jti"], access_token_data["exp"])
     return JSONResponse(
         content="Logged out succesfully", status_code=status.HTTP_200_OK
     )
 
 
-@auth_router.get("/me", response_model=UserRead)
-async def get_current_user(
+@auth_router.post("/logout-all")
+async def logout_all_sessions(
     access_token_data=Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
 ):
-    user = await auth_service.get_user_by_id(
-        access_token_data["user_data"]["sub"], session
-    )
+    user_id = access_token_data["user_data"]["sub"]
+
+    user = await auth_service.revoke_all_tokens(user_id, session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    return user
+    return JSONResponse(
+        content="Logged out of all sessions", status_code=status.HTTP_200_OK
+    )
+
+
+@auth_router.get("/sessions", response_model=list[SessionRead])
+async def list_sessions(access_token_data=Depends(AccessTokenBearer())):
+    user_data = access_token_data["user_data"]
+    sessions = await get_sessions(user_data["sub"])
+    for entry in sessions:
+        entry["current"] = entry["sid"] == user_data.get("sid")
+    return sorted(sessions, key=lambda entry: entry["created_at"], reverse=True)
+
+
+@auth_router.get("/me", response_model=UserRead)
+async def get_current_user(current_user: User = Depends(get_authenticated_user)):
+    return current_user
 
 
 @auth_router.patch("/deactivate", status_code=status.HTTP_200_OK)
@@ -146,27 +192,18 @@ async def verify_email(
 
 @auth_router.get("/resend-verification", status_code=status.HTTP_200_OK)
 async def resend_verification(
-    session: AsyncSession = Depends(get_session),
-    access_token_data=Depends(AccessTokenBearer()),
+    current_user: User = Depends(get_authenticated_user),
 ):
-    current_user = await auth_service.get_user_by_id(
-        access_token_data["user_data"]["sub"], session
-    )
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
     if current_user.is_verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Already verified"
         )
 
-    cnt = await get_resend_count(str(current_user.uuid))
-    if cnt >= Config.RESEND_LIMIT_PER_HOUR:
-        raise HTTPException(status_code=429, detail="Resend limit exceeded. Try later.")
+    # counted atomically with the check, concurrent resends can't slip past
+    await enforce(
+        (RESEND_PER_USER, str(current_user.uuid)),
+        detail="Resend limit exceeded. Try later.",
+    )
 
-    verification_token = await create_verification_for_user(str(current_user.uuid))
-    await increment_resend_count(str(current_user.uuid))
-    send_verification_email_bg(current_user.email, verification_token.token)
+    await create_verification_for_user(str(current_user.uuid), current_user.email)
     return JSONResponse(content={"detail": "Verification sent"})
@@ -1,99 +1,257 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from typing import List, Dict
-from api.core.security.security import AccessTokenBearer
-from api.database.models import Message
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import (
+    APIRouter,
+    WebSocket,
+    WebSocketDisconnect,
+    Depends,
+    HTTPException,
+    Query,
+    status,
+)
+from typing import List, Dict, Optional
+from api.core.config import Config
+from api.core.metrics import Gauge
+from api.core.ratelimit import (
+    WS_CONNECT_PER_IP,
+    WS_MESSAGES_PER_USER,
+    hit,
+    limit_by_ip,
+)
+from api.core.security.security import AccessTokenBearer, WebSocketAccessTokenBearer
 from api.database import get_session
-import json
+from api.schemas.chat import ConversationPage, MessagePage
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.database.redis import SESSIONS_REVOKED_CHANNEL, redis
+from redis.asyncio.client import PubSub
+from pydantic_core import to_json
+from api.services.chat import ChatService, message_writer
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
 import asyncio
-import redis
-from api.core.config import Config
+import logging
 
 chat_ws_router = APIRouter(prefix="/ws", tags=["chat_ws"])
 
 
-REDIS_URL = Config.REDIS_URL
+CHANNEL_PREFIX = "chat:user:"
 
 
 class RedisConnectionManager:
+    """Delivers chat messages across app nodes.
+
+    Every user has their own Redis channel and a node only subscribes to the
+    channels of users it currently holds sockets for, so it never receives
+    (or decodes) traffic meant for users connected elsewhere. On top of that
+    every node listens for revoked sessions and drops the affected sockets.
+    """
+
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
-        self.redis = None
-        self.pub = None
+        self.redis = redis
+        self.pub: Optional[PubSub] = None
+        self._listener: Optional[asyncio.Task] = None
 
     async def start(self):
-        self.redis = redis.from_url(REDIS_URL)
-        self.pub = self.redis.pubsub()
-        asyncio.create_task(self.listen_messages())
+        self.pub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self.pub.subscribe(SESSIONS_REVOKED_CHANNEL)
+        self._listener = asyncio.create_task(self.listen_messages())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        if self.pub:
+            await self.pub.aclose()
 
     async def connect(self, user_id: str, websocket: WebSocket):
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
+            await self.pub.subscribe(CHANNEL_PREFIX + user_id)  # type: ignore
         self.active_connections[user_id].append(websocket)
 
-    def disconnect(self, user_id: str, websocket: WebSocket):
+    async def disconnect(self, user_id: str, websocket: WebSocket):
         self.active_connections[user_id].remove(websocket)
         if not self.active_connections[user_id]:
             del self.active_connections[user_id]
+            await self.pub.unsubscribe(CHANNEL_PREFIX + user_id)  # type: ignore
 
-    async def send_personal_message(self, message: dict, user_id: str):
-        for ws in self.active_connections.get(user_id, []):
-            await ws.send_json(message)
+    async def close_user(self, user_id: str):
+        # each socket's handler fails its next receive and cleans up
+        for ws in list(self.active_connections.get(user_id, [])):
+            try:
+                await ws.close(code=status.WS_1008_POLICY_VIOLATION)
+            except RuntimeError:
+                pass
+
+    async def send_personal_message(self, payload: str, user_id: str):
+        for ws in list(self.active_connections.get(user_id, [])):
+            try:
+                await ws.send_text(payload)
+            except (WebSocketDisconnect, RuntimeError):
+                # the socket's own handler cleans up on disconnect
+                pass
 
     async def publish_message(self, message: dict):
-        await self.redis.publish("chat_channel", json.dumps(message))  # type: ignore
+        # encoded once, in pydantic-core; every socket on every node gets
+        # these same bytes (decoded once per node by the subscriber)
+        payload = to_json(message)
+        recipients = {str(message["recipient_id"]), str(message["sender_id"])}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in recipients:
+                pipe.publish(CHANNEL_PREFIX + user_id, payload)
+            await pipe.execute()
 
     async def listen_messages(self):
-        sub = self.redis.pubsub()  # type: ignore
-        await sub.subscribe("chat_channel")  # type: ignore
-        async for raw in sub.listen():  # type: ignore
-            if raw["type"] == "message":
-                message = json.loads(raw["data"])
-                await self.send_personal_message(message, message["recipient_id"])
-                await self.send_personal_message(message, message["sender_id"])
+        while True:
+            try:
+                raw = await self.pub.get_message(timeout=1.0)  # type: ignore
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("chat listener failed, retrying")
+                await asyncio.sleep(1)
+                continue
+
+            if raw and raw["type"] == "message":
+                if raw["channel"] == SESSIONS_REVOKED_CHANNEL:
+                    await self.close_user(raw["data"])
+                    continue
+                user_id = raw["channel"].removeprefix(CHANNEL_PREFIX)
+                # payload is forwarded as-is, no decode on the hot path
+                await self.send_personal_message(raw["data"], user_id)
 
 
 manager = RedisConnectionManager()
+Gauge(
+    "websocket_connections",
+    "Open chat websockets on this node",
+    callback=lambda: sum(map(len, manager.active_connections.values())),
+)
+Gauge(
+    "websocket_users",
+    "Users with at least one chat websocket on this node",
+    callback=lambda: len(manager.active_connections),
+)
+chat_service = ChatService()
+
+
+@chat_ws_router.get("/conversations", response_model=ConversationPage)
+async def get_conversations(
+    limit: int = Query(Config.CHAT_PAGE_SIZE, ge=1, le=Config.CHAT_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    try:
+        conversations, next_cursor = await chat_service.get_conversations(
+            user_id, session, limit, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
+    return {"conversations": conversations, "next_cursor": next_cursor}
 
-@chat_ws_router.websocket("/chat/")
+
+@chat_ws_router.get("/conversations/{peer_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    peer_id: UUID,
+    limit: int = Query(Config.CHAT_PAGE_SIZE, ge=1, le=Config.CHAT_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    try:
+        messages, next_cursor = await chat_service.get_messages(
+            user_id, str(peer_id), session, limit, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"messages": messages, "next_cursor": next_cursor}
+
+
+@chat_ws_router.post("/conversations/{peer_id}/read")
+async def mark_conversation_read(
+    peer_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    await chat_service.mark_read(user_id, str(peer_id), session)
+    return {"detail": "Conversation marked as read"}
+
+
+@chat_ws_router.websocket(
+    "/chat/", dependencies=[Depends(limit_by_ip(WS_CONNECT_PER_IP))]
+)
 async def websocket_endpoint(
     websocket: WebSocket,
-    access_token_data=Depends(AccessTokenBearer),
-    session: AsyncSession = Depends(get_session),
+    access_token_data=Depends(WebSocketAccessTokenBearer()),
 ):
     user_id = access_token_data["user_data"]["sub"]
     await manager.connect(user_id, websocket)
 
     try:
         while True:
-            data = await websocket.receive_json()
+            try:
+                data = await websocket.receive_json()
+            except (KeyError, ValueError):
+                # binary frame or not JSON; consumed, the socket is still fine
+                await websocket.send_json({"error": "Invalid message"})
+                continue
+
+            retry_after = await hit((WS_MESSAGES_PER_USER, user_id))
+            if retry_after:
+                await websocket.send_json(
+                    {"error": "Rate limit exceeded", "retry_after": retry_after}
+                )
+                continue
             # data: {"recipient_id": str, "content": str, "item_id": Optional[str]}
 
-            message = Message(
-                sender_id=user_id,
-                recipient_id=data["recipient_id"],
-                item_id=data.get("item_id"),
-                content=data["content"],
-            )
-            session.add(message)
-            await session.commit()
-            await session.refresh(message)
-
-            message_dict = {
-                "id": message.id,
-                "sender_id": message.sender_id,
-                "recipient_id": message.recipient_id,
-                "item_id": message.item_id,
-                "content": message.content,
-                "created_at": str(message.created_at),
+            try:
+                recipient_id = UUID(data["recipient_id"])
+                item_id = UUID(data["item_id"]) if data.get("item_id") else None
+                content = data["content"]
+            except (KeyError, TypeError, ValueError):
+                await websocket.send_json({"error": "Invalid message"})
+                continue
+
+            # checked before it is published: peers and the write-behind
+            # batch would otherwise get whatever the client sent
+            if (
+                not isinstance(content, str)
+                or not content.strip()
+                or len(content) > Config.CHAT_MESSAGE_MAX_LENGTH
+                or "\x00" in content  # Postgres text can't hold NUL
+            ):
+                await websocket.send_json({"error": "Invalid message"})
+                continue
+
+            # id and timestamp are assigned here so we can deliver before the
+            # row is written; message_writer persists it in the next batch
+            message = {
+                "id": uuid4(),
+                "sender_id": UUID(user_id),
+                "recipient_id": recipient_id,
+                "item_id": item_id,
+                "content": content,
+                "created_at": datetime.now(tz=timezone.utc),
             }
 
-            # send to recipient
-            await manager.send_personal_message(message_dict, str(message.recipient_id))
-            # update UI to sender
-            await manager.send_personal_message(message_dict, str(message.sender_id))
+            # fan out to recipient and sender's sockets on whichever node hosts them
+            await manager.publish_message(message)
+            await message_writer.submit(message)
 
-    except WebSocketDisconnect:
-        manager.disconnect(user_id, websocket)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: closed by the server, e.g. its sessions were revoked
+        pass
+    finally:
+        # whatever ended the loop (a Redis error too), drop the socket and
+        # the channel subscription with it
+        await manager.disconnect(user_id, websocket)
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from uuid import UUID
+from api.core.config import Config
+from api.core.security.security import AccessTokenBearer
+from api.database import get_session
+from api.database.models import ExchangeStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.services import ExchangeService
+from api.schemas.exchange import ExchangeCreate, ExchangePage, ExchangeRead
+
+exchange_router = APIRouter(prefix="/exchanges")
+exchange_service = ExchangeService()
+
+
+@exchange_router.post(
+    "/", response_model=ExchangeRead, status_code=status.HTTP_201_CREATED
+)
+async def propose_exchange(
+    data: ExchangeCreate,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    exchange = await exchange_service.propose(user_id, data, session)
+    if not exchange:
+        raise HTTPException(
+            status_code=400,
+            detail="Offer your own available item for someone else's available item",
+        )
+
+    return exchange
+
+
+@exchange_router.get("/", response_model=ExchangePage)
+async def get_exchanges(
+    incoming: bool = True,
+    exchange_status: Optional[ExchangeStatus] = Query(None, alias="status"),
+    limit: int = Query(Config.ITEMS_PAGE_SIZE, ge=1, le=Config.ITEMS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    try:
+        exchanges, next_cursor = await exchange_service.get_exchanges(
+            user_id,
+            session,
+            limit,
+            incoming=incoming,
+            status=exchange_status,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"exchanges": exchanges, "next_cursor": next_cursor}
+
+
+@exchange_router.post("/{exchange_id}/accept", response_model=ExchangeRead)
+async def accept_exchange(
+    exchange_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+
+    result = await exchange_service.accept(str(exchange_id), user_id, session)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Pending exchange not found")
+    if result is False:
+        raise HTTPException(
+            status_code=409, detail="One of the items is no longer available"
+        )
+
+    return result
+
+
+@exchange_router.post("/{exchange_id}/reject", response_model=ExchangeRead)
+async def reject_exchange(
+    exchange_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    exchange = await exchange_service.reject(str(exchange_id), user_id, session)
+    if not exchange:
+        raise HTTPException(status_code=404, detail="Pending exchange not found")
+
+    return exchange
+
+
+@exchange_router.post("/{exchange_id}/cancel", response_model=ExchangeRead)
+async def cancel_exchange(
+    exchange_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    exchange = await exchange_service.cancel(str(exchange_id), user_id, session)
+    if not exchange:
+        raise HTTPException(status_code=404, detail="Pending exchange not found")
+
+    return exchange
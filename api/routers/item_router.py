@@ -1,9 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Literal, Optional
+from uuid import UUID
+from api.core.conditional import (
+    http_date,
+    if_match_versions,
+    is_conditional,
+    is_not_modified,
+    resource_etag,
+    validator_headers,
+)
+from api.core.config import Config
+from api.core.storage import ImageTooLarge, UnsupportedImage
 from api.core.security.security import AccessTokenBearer
-from api.database import get_session
+from api.database import async_session, get_session
 from sqlalchemy.ext.asyncio import AsyncSession
 from api.services import ItemService
-from api.schemas.item import ItemCreate, ItemRead, ItemUpdate
+from api.services.item import ItemVersionConflict
+from api.schemas.item import (
+    ItemCreate,
+    ItemImageRead,
+    ItemPage,
+    ItemRead,
+    ItemUpdate,
+)
+import csv
+import io
+import json
 
 item_router = APIRouter(prefix="/items")
 item_service = ItemService()
@@ -20,38 +52,264 @@ async def create_item(
     return item
 
 
-@item_router.get("/")
-async def get_items(session: AsyncSession = Depends(get_session)):
-    return await item_service.get_items(session)
+async def _conditional_page(request: Request, **query):
+    try:
+        if is_conditional(request):
+            validators = await item_service.get_items_validators(**query)
+            if is_not_modified(request, **validators):
+                headers = validator_headers(**validators)
+                return Response(status_code=304, headers=headers)
 
+        page = await item_service.get_items(**query)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@item_router.get("/user/{user_id}")
-async def get_item(user_id: str, session: AsyncSession = Depends(get_session)):
-    return await item_service.get_items_by_user_id(user_id, session)
+    # pre-rendered ItemPage JSON; response_model only documents it
+    return Response(
+        content=page["body"],
+        media_type="application/json",
+        headers=validator_headers(page["etag"], page["last_modified"]),
+    )
+
+
+@item_router.get("/", response_model=ItemPage)
+async def get_items(
+    request: Request,
+    limit: int = Query(Config.ITEMS_PAGE_SIZE, ge=1, le=Config.ITEMS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    owner_id: Optional[UUID] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await _conditional_page(
+        request,
+        session=session,
+        limit=limit,
+        cursor=cursor,
+        is_available=is_available,
+        owner_id=str(owner_id) if owner_id else None,
+    )
+
+
+@item_router.get("/search", response_model=ItemPage)
+async def search_items(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(Config.ITEMS_PAGE_SIZE, ge=1, le=Config.ITEMS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        items, next_cursor = await item_service.search_items(
+            q, session, limit, cursor=cursor, is_available=is_available
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@item_router.get("/user/{user_id}", response_model=ItemPage)
+async def get_item(
+    request: Request,
+    user_id: UUID,
+    limit: int = Query(Config.ITEMS_PAGE_SIZE, ge=1, le=Config.ITEMS_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    return await _conditional_page(
+        request,
+        session=session,
+        limit=limit,
+        cursor=cursor,
+        is_available=is_available,
+        owner_id=str(user_id),
+    )
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "owner_id",
+    "is_available",
+    "version",
+    "updated_at",
+)
+
+
+async def _export_stream(format: str, is_available, owner_id):
+    # own session: it has to outlive the handler while the body streams
+    async with async_session() as session:
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in item_service.export_items(
+                session, is_available, owner_id
+            ):
+                writer.writerows(
+                    [
+                        r.id,
+                        r.name,
+                        r.description,
+                        r.owner_id,
+                        r.is_available,
+                        r.version,
+                        r.updated_at.isoformat(),
+                    ]
+                    for r in rows
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+            return
+
+        async for rows in item_service.export_items(session, is_available, owner_id):
+            yield "".join(
+                json.dumps(
+                    {
+                        "id": str(r.id),
+                        "name": r.name,
+                        "description": r.description,
+                        "owner_id": str(r.owner_id),
+                        "is_available": r.is_available,
+                        "version": r.version,
+                        "updated_at": r.updated_at.isoformat(),
+                    }
+                )
+                + "\n"
+                for r in rows
+            )
+
+
+@item_router.get("/export")
+async def export_items(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    is_available: Optional[bool] = None,
+    owner_id: Optional[UUID] = None,
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_stream(format, is_available, str(owner_id) if owner_id else None),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+
+@item_router.post("/import")
+async def import_items(
+    request: Request,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    return await item_service.import_items(user_id, request.stream(), session)
+
+
+@item_router.get("/{item_id}", response_model=ItemRead)
+async def get_item_by_id(
+    item_id: UUID,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    if is_conditional(request):
+        validators = await item_service.get_item_validators(str(item_id), session)
+        if validators is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if is_not_modified(request, **validators):
+            return Response(status_code=304, headers=validator_headers(**validators))
+
+    item = await item_service.get_item(str(item_id), session)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    last_modified = http_date(datetime.fromisoformat(item["updated_at"]))
+    response.headers.update(
+        validator_headers(resource_etag(item["version"]), last_modified)
+    )
+    return item
 
 
 @item_router.put("/{item_id}")
 async def update_item(
     item_id: str,
     item_data: ItemUpdate,
+    request: Request,
+    response: Response,
     access_token_data=Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
 ):
     user_id = access_token_data["user_data"]["sub"]
 
-    item = await item_service.get_item_by_id(item_id, session)
+    try:
+        updated_item = await item_service.update_item(
+            item_id, user_id, item_data, session, versions=if_match_versions(request)
+        )
+    except ItemVersionConflict:
+        raise HTTPException(status_code=412, detail="Item has been modified")
 
-    if not item:
+    if updated_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    if str(item.owner_id) != user_id:
+    if updated_item is False:
         raise HTTPException(status_code=403, detail="Not allowed to update this item")
 
-    updated_item = await item_service.update_item(item_id, item_data, session)
-
+    response.headers["ETag"] = resource_etag(updated_item.version)
     return updated_item
 
 
+@item_router.post(
+    "/{item_id}/images", response_model=ItemImageRead, status_code=201
+)
+async def upload_item_image(
+    item_id: UUID,
+    file: UploadFile,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+
+    try:
+        image = await item_service.add_image(str(item_id), user_id, file, session)
+    except UnsupportedImage:
+        raise HTTPException(
+            status_code=415, detail="Only JPEG, PNG, GIF and WebP are accepted"
+        )
+    except ImageTooLarge:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    if image is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if image is False:
+        raise HTTPException(status_code=403, detail="Not allowed to update this item")
+
+    return image
+
+
+@item_router.delete("/{item_id}/images/{image_id}")
+async def delete_item_image(
+    item_id: UUID,
+    image_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+
+    result = await item_service.remove_image(
+        str(item_id), str(image_id), user_id, session
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if result is False:
+        raise HTTPException(status_code=403, detail="Not allowed to update this item")
+
+    return {"detail": "Image deleted successfully"}
+
+
 @item_router.delete("/{item_id}")
 async def delete_item_route(
     item_id: str,
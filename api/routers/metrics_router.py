@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from api.core.metrics import registry
+from api.database import pool_status
+
+metrics_router = APIRouter(prefix="/metrics")
+
+
+@metrics_router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@metrics_router.get("/db-pool")
+async def get_db_pool_metrics():
+    return pool_status()
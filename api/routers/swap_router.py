@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException
+from uuid import UUID
+from api.core.security.security import AccessTokenBearer
+from api.database import get_session
+from api.database.models import SwapStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.services import SwapService
+from api.schemas.item import ItemRead
+from api.schemas.swap import SwapSuggestionRead
+
+swap_router = APIRouter(prefix="/swaps")
+swap_service = SwapService()
+
+
+@swap_router.get("/wishlist", response_model=list[ItemRead])
+async def get_wishlist(
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    return await swap_service.get_wishlist(user_id, session)
+
+
+@swap_router.put("/wishlist/{item_id}")
+async def add_to_wishlist(
+    item_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    if not await swap_service.add_to_wishlist(user_id, str(item_id), session):
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    return {"detail": "Item added to wishlist"}
+
+
+@swap_router.delete("/wishlist/{item_id}")
+async def remove_from_wishlist(
+    item_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    if not await swap_service.remove_from_wishlist(user_id, str(item_id), session):
+        raise HTTPException(status_code=404, detail="Item not in wishlist")
+
+    return {"detail": "Item removed from wishlist"}
+
+
+@swap_router.get("/suggestions", response_model=list[SwapSuggestionRead])
+async def get_suggestions(
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    return await swap_service.get_suggestions(user_id, session)
+
+
+@swap_router.post("/suggestions/{suggestion_id}/accept")
+async def accept_suggestion(
+    suggestion_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+
+    result = await swap_service.accept(str(suggestion_id), user_id, session)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Pending suggestion not found")
+    if result is False:
+        raise HTTPException(
+            status_code=409, detail="One of the items is no longer available"
+        )
+
+    if result == SwapStatus.accepted:
+        return {"detail": "Swap completed", "status": result}
+    return {"detail": "Waiting for the other participants", "status": result}
+
+
+@swap_router.post("/suggestions/{suggestion_id}/reject")
+async def reject_suggestion(
+    suggestion_id: UUID,
+    access_token_data=Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+):
+    user_id = access_token_data["user_data"]["sub"]
+    if not await swap_service.reject(str(suggestion_id), user_id, session):
+        raise HTTPException(status_code=404, detail="Pending suggestion not found")
+
+    return {"detail": "Suggestion rejected"}
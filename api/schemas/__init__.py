@@ -1 +1 @@
-from .user import UserCreate, UserRead, UserLogin
+from .user import UserCreate, UserRead, UserLogin, SessionRead
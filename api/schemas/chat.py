@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+
+class MessageRead(BaseModel):
+    id: UUID
+    sender_id: UUID
+    recipient_id: UUID
+    item_id: Optional[UUID]
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class MessagePage(BaseModel):
+    messages: list[MessageRead]
+    next_cursor: Optional[str] = None
+
+
+class ConversationRead(BaseModel):
+    peer_id: UUID
+    last_message: MessageRead
+    last_message_at: datetime
+    unread_count: int
+
+    class Config:
+        from_attributes = True
+
+
+class ConversationPage(BaseModel):
+    conversations: list[ConversationRead]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+from api.database.models import ExchangeStatus
+
+
+class ExchangeCreate(BaseModel):
+    item_from_id: UUID
+    item_to_id: UUID
+
+
+class ExchangeRead(BaseModel):
+    id: UUID
+    from_user_id: UUID
+    to_user_id: UUID
+    item_from_id: UUID
+    item_to_id: UUID
+    status: ExchangeStatus
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ExchangePage(BaseModel):
+    exchanges: list[ExchangeRead]
+    next_cursor: Optional[str] = None
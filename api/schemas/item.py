@@ -1,4 +1,5 @@
-from pydantic import BaseModel, HttpUrl
+from datetime import datetime
+from pydantic import BaseModel
 from typing import Optional
 from uuid import UUID
 
@@ -10,7 +11,13 @@ class ItemCreate(BaseModel):
 
 class ItemImageRead(BaseModel):
     id: UUID
-    image_url: HttpUrl
+    # relative to the API unless MEDIA_BASE_URL points elsewhere
+    image_url: str
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 
 class ItemRead(BaseModel):
@@ -19,12 +26,19 @@ class ItemRead(BaseModel):
     description: Optional[str]
     owner_id: UUID
     is_available: bool
+    version: int
+    updated_at: datetime
+    images: list[ItemImageRead] = []
 
     class Config:
         from_attributes = True
 
 
+class ItemPage(BaseModel):
+    items: list[ItemRead]
+    next_cursor: Optional[str] = None
+
+
 class ItemUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
-    images: Optional[list[str]] = None
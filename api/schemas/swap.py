@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from api.database.models import SwapStatus
+
+
+class SwapLegRead(BaseModel):
+    receiver_id: UUID
+    giver_id: UUID
+    item_id: UUID
+    accepted: bool
+
+    class Config:
+        from_attributes = True
+
+
+class SwapSuggestionRead(BaseModel):
+    id: UUID
+    status: SwapStatus
+    size: int
+    created_at: datetime
+    legs: list[SwapLegRead]
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
+from typing import Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -26,3 +27,12 @@ class UserRead(BaseModel):
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+
+
+class SessionRead(BaseModel):
+    sid: str
+    created_at: datetime
+    expires_at: datetime
+    user_agent: Optional[str] = None
+    ip: Optional[str] = None
+    current: bool = False
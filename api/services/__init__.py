@@ -1,2 +1,5 @@
 from .auth import AuthService
 from .item import ItemService
+from .chat import ChatService, MessageWriter
+from .exchange import ExchangeService
+from .swap import SwapService
@@ -1,8 +1,26 @@
 from api.schemas import UserCreate
 from api.database.models import User
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.core.security.utils import hash_password
-from sqlalchemy import select
+from api.core.security.utils import hash_password_async
+from api.database.redis import revoke_user_sessions
+from api.services.verification import issue_verification, queue_verification_email
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+
+
+class RegistrationConflict(Exception):
+    """A unique index rejected the signup; `field` says which one."""
+
+    def __init__(self, field: str):
+        super().__init__(field)
+        self.field = field
+
+
+def _violated_constraint(error: IntegrityError) -> str:
+    # asyncpg reports the index by name; the DBAPI wrapper only in its text
+    cause = getattr(error.orig, "__cause__", None)
+    return getattr(cause, "constraint_name", None) or str(error.orig)
 
 
 class AuthService:
@@ -23,24 +41,76 @@ class AuthService:
         result = await session.execute(statement)
         return result.scalar_one_or_none()
 
-    async def create_user(self, data: UserCreate, session: AsyncSession) -> User:
-        user = User(
-            email=data.email,
-            username=data.username,
-            hashed_password=hash_password(data.password1),
-        )
+    async def register_user(
+        self, data: UserCreate, session: AsyncSession
+    ) -> User:
+        """Insert the user, their first verification token and its email together.
+
+        No existence checks up front: the unique indexes on email and username
+        decide, which also settles concurrent signups for the same address.
+        """
+        hashed_password = await hash_password_async(data.password1)
+        try:
+            result = await session.execute(
+                insert(User)
+                .values(
+                    email=data.email,
+                    username=data.username,
+                    hashed_password=hashed_password,
+                )
+                .returning(User)
+            )
+            user = result.scalar_one()
+            token = await issue_verification(
+                user.uuid, session, invalidate_previous=False
+            )
+            # same transaction: no user without its email, no email without a user
+            await queue_verification_email(user.email, token, session)
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            if "username" in _violated_constraint(e):
+                raise RegistrationConflict("username")
+            raise RegistrationConflict("email")
 
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
         return user
 
+    async def update_password_hash(
+        self, user: User, hashed_password: str, session: AsyncSession
+    ) -> None:
+        await session.execute(
+            update(User)
+            .where(User.uuid == user.uuid)
+            .values(hashed_password=hashed_password)
+        )
+        await session.commit()
+
     async def deactivate_user_account(self, user_id, session: AsyncSession):
-        user = await self.get_user_by_id(user_id, session)
+        return await self.revoke_all_tokens(user_id, session, is_active=False)
+
+    async def revoke_all_tokens(self, user_id, session: AsyncSession, **values):
+        """Invalidate every token issued to the user so far, in one write.
+
+        Bumps tokens_valid_after instead of blocklisting jtis, so it costs the
+        same however many devices are logged in. Extra column values (e.g.
+        is_active=False) go into the same UPDATE.
+        """
+        result = await session.execute(
+            update(User)
+            .where(User.uuid == user_id)
+            .values(tokens_valid_after=datetime.now(tz=timezone.utc), **values)
+            .returning(User)
+        )
+        user = result.scalar_one_or_none()
         if not user:
+            await session.rollback()
             return None
 
-        user.is_active = False
         await session.commit()
-        await session.refresh(user)
+        await revoke_user_sessions(
+            str(user.uuid),
+            user.is_active,
+            user.is_verified,
+            user.tokens_valid_after.timestamp(),
+        )
         return user
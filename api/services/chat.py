@@ -0,0 +1,263 @@
+from sqlalchemy import case, func, insert, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from api.core.pagination import encode_cursor, decode_cursor
+from api.database import async_session
+from api.database.models import Conversation, Message
+from api.core.config import Config
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+import asyncio
+import logging
+
+
+class ChatService:
+    async def save_messages(self, rows: list[dict], session: AsyncSession):
+        await session.execute(insert(Message), rows)
+
+        # fold the batch into one row per (user, peer) before upserting
+        conversations: dict[tuple, dict] = {}
+        for row in rows:
+            sides = (
+                (row["sender_id"], row["recipient_id"], 0),
+                (row["recipient_id"], row["sender_id"], 1),
+            )
+            for user_id, peer_id, unread in sides:
+                conv = conversations.setdefault(
+                    (user_id, peer_id),
+                    {"user_id": user_id, "peer_id": peer_id, "unread_count": 0},
+                )
+                last_at = conv.get("last_message_at", row["created_at"])
+                if row["created_at"] >= last_at:
+                    conv["last_message_id"] = row["id"]
+                    conv["last_message_at"] = row["created_at"]
+                if user_id != peer_id:
+                    conv["unread_count"] += unread
+
+        # sorted so concurrent flushes lock conversation rows in the same order
+        values = [conversations[key] for key in sorted(conversations)]
+        statement = pg_insert(Conversation).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Conversation.user_id, Conversation.peer_id],
+            set_={
+                "last_message_id": case(
+                    (
+                        statement.excluded.last_message_at
+                        >= Conversation.last_message_at,
+                        statement.excluded.last_message_id,
+                    ),
+                    else_=Conversation.last_message_id,
+                ),
+                "last_message_at": func.greatest(
+                    Conversation.last_message_at, statement.excluded.last_message_at
+                ),
+                "unread_count": Conversation.unread_count
+                + statement.excluded.unread_count,
+            },
+        )
+        await session.execute(statement)
+
+    async def get_conversations(
+        self,
+        user_id: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> tuple[Sequence[Conversation], Optional[str]]:
+        statement = (
+            select(Conversation)
+            .options(joinedload(Conversation.last_message, innerjoin=True))
+            .where(Conversation.user_id == user_id)
+        )
+        if cursor:
+            last_at, last_peer = decode_cursor(cursor, 2)
+            statement = statement.where(
+                tuple_(Conversation.last_message_at, Conversation.peer_id)
+                < tuple_(datetime.fromisoformat(last_at), UUID(last_peer))
+            )
+
+        statement = statement.order_by(
+            Conversation.last_message_at.desc(), Conversation.peer_id.desc()
+        ).limit(limit + 1)
+        result = await session.execute(statement)
+        conversations = result.scalars().all()
+
+        if len(conversations) > limit:
+            conversations = conversations[:limit]
+            last = conversations[-1]
+            next_cursor = encode_cursor(last.last_message_at.isoformat(), last.peer_id)
+            return conversations, next_cursor
+        return conversations, None
+
+    async def get_messages(
+        self,
+        user_id: str,
+        peer_id: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> tuple[Sequence[Message], Optional[str]]:
+        before = None
+        if cursor:
+            last_at, last_id = decode_cursor(cursor, 2)
+            before = tuple_(datetime.fromisoformat(last_at), UUID(last_id))
+
+        # each direction is its own range on the (sender, recipient, created_at)
+        # index; merging two limited ranges keeps this O(page)
+        def direction(sender_id, recipient_id):
+            statement = select(Message).where(
+                Message.sender_id == sender_id, Message.recipient_id == recipient_id
+            )
+            if before is not None:
+                statement = statement.where(
+                    tuple_(Message.created_at, Message.id) < before
+                )
+            return statement.order_by(
+                Message.created_at.desc(), Message.id.desc()
+            ).limit(limit + 1)
+
+        if user_id == peer_id:
+            statement = direction(user_id, peer_id)
+        else:
+            merged = union_all(
+                direction(user_id, peer_id), direction(peer_id, user_id)
+            ).subquery()
+            message = aliased(Message, merged)
+            statement = (
+                select(message)
+                .order_by(message.created_at.desc(), message.id.desc())
+                .limit(limit + 1)
+            )
+
+        result = await session.execute(statement)
+        messages = result.scalars().all()
+
+        if len(messages) > limit:
+            messages = messages[:limit]
+            last = messages[-1]
+            return messages, encode_cursor(last.created_at.isoformat(), last.id)
+        return messages, None
+
+    async def mark_read(self, user_id: str, peer_id: str, session: AsyncSession):
+        await session.execute(
+            update(Conversation)
+            .where(Conversation.user_id == user_id, Conversation.peer_id == peer_id)
+            .values(unread_count=0)
+        )
+        await session.commit()
+
+
+class MessageWriter:
+    """Write-behind buffer for chat messages.
+
+    Messages are delivered before they hit Postgres; rows are queued here and
+    flushed as multi-row INSERTs once a batch fills up or the flush interval
+    passes. A session is only held for the duration of a flush.
+    """
+
+    def __init__(self):
+        self.chat_service = ChatService()
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(
+            maxsize=Config.CHAT_WRITE_BUFFER_SIZE
+        )
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._batch: list[dict] = []
+
+    async def start(self):
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # stop the timer loop, then drain whatever is still buffered
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+
+        if self._inflight:
+            # a failure was already logged by _run
+            await asyncio.gather(self._inflight, return_exceptions=True)
+        await self._flush(self._batch)
+        self._batch = []
+
+        while not self.queue.empty():
+            await self._flush(self._take_batch())
+
+    async def submit(self, row: dict):
+        # blocks the sending socket when the buffer is full (backpressure)
+        await self.queue.put(row)
+
+    def _take_batch(self) -> list[dict]:
+        batch = []
+        while len(batch) < Config.CHAT_FLUSH_BATCH_SIZE and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        interval = Config.CHAT_FLUSH_INTERVAL_MS / 1000
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + interval
+
+            while len(self._batch) < Config.CHAT_FLUSH_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                self._batch.append(row)
+
+            batch, self._batch = self._batch, []
+            # shielded so a shutdown mid-flush lets stop() await it instead
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            try:
+                await asyncio.shield(self._inflight)
+            except Exception:
+                # one failed flush must not stop every later one
+                logging.exception("chat flush failed, dropping %s messages", len(batch))
+            self._inflight = None
+
+    async def _flush(self, batch: list[dict], retries: int = 3):
+        if not batch:
+            return
+
+        for attempt in range(retries):
+            try:
+                async with async_session() as session:
+                    await self.chat_service.save_messages(batch, session)
+                    await session.commit()
+                return
+            except DBAPIError as e:
+                if not e.connection_invalidated:
+                    # one bad row (unknown recipient, a value the column
+                    # rejects) must not sink the batch; retrying can't help
+                    await self._flush_rows(batch)
+                    return
+                logging.exception("chat flush failed (attempt %s)", attempt + 1)
+            except Exception:
+                logging.exception("chat flush failed (attempt %s)", attempt + 1)
+            await asyncio.sleep(2**attempt)
+
+        logging.error("dropping %s chat messages after %s retries", len(batch), retries)
+
+    async def _flush_rows(self, batch: list[dict]):
+        async with async_session() as session:
+            for row in batch:
+                try:
+                    await self.chat_service.save_messages([row], session)
+                    await session.commit()
+                except DBAPIError:
+                    await session.rollback()
+                    logging.exception("dropping chat message %s", row["id"])
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,191 @@
+from sqlalchemy import and_, cast, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from api.core.pagination import encode_cursor, decode_cursor
+from api.database.models import ExchangeRequest, ExchangeStatus, Item
+from api.database.redis import mark_swap_dirty
+from api.schemas.exchange import ExchangeCreate
+from api.services.item import invalidate_items
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+
+class ExchangeService:
+    async def propose(
+        self, user_id: str, data: ExchangeCreate, session: AsyncSession
+    ) -> ExchangeRequest | None:
+        # Ownership and availability are checked by the INSERT ... SELECT
+        # itself, so there is no read-then-write window
+        item_from = aliased(Item)
+        item_to = aliased(Item)
+        source = select(
+            func.gen_random_uuid(),
+            item_from.owner_id,
+            item_to.owner_id,
+            item_from.id,
+            item_to.id,
+            cast(literal(ExchangeStatus.pending.value), ExchangeRequest.status.type),
+        ).where(
+            item_from.id == data.item_from_id,
+            item_from.owner_id == user_id,
+            item_from.is_available,
+            item_to.id == data.item_to_id,
+            item_to.owner_id != user_id,
+            item_to.is_available,
+        )
+        statement = (
+            insert(ExchangeRequest)
+            .from_select(
+                [
+                    "id",
+                    "from_user_id",
+                    "to_user_id",
+                    "item_from_id",
+                    "item_to_id",
+                    "status",
+                ],
+                source,
+            )
+            .returning(ExchangeRequest)
+        )
+        result = await session.execute(statement)
+        exchange = result.scalar_one_or_none()
+        await session.commit()
+        return exchange
+
+    async def get_exchanges(
+        self,
+        user_id: str,
+        session: AsyncSession,
+        limit: int,
+        incoming: bool = True,
+        status: Optional[ExchangeStatus] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[Sequence[ExchangeRequest], Optional[str]]:
+        party = ExchangeRequest.to_user_id if incoming else ExchangeRequest.from_user_id
+        statement = select(ExchangeRequest).where(party == user_id)
+
+        if status is not None:
+            statement = statement.where(ExchangeRequest.status == status)
+        if cursor:
+            last_at, last_id = decode_cursor(cursor, 2)
+            statement = statement.where(
+                tuple_(ExchangeRequest.created_at, ExchangeRequest.id)
+                < tuple_(datetime.fromisoformat(last_at), UUID(last_id))
+            )
+
+        statement = statement.order_by(
+            ExchangeRequest.created_at.desc(), ExchangeRequest.id.desc()
+        ).limit(limit + 1)
+        result = await session.execute(statement)
+        exchanges = result.scalars().all()
+
+        if len(exchanges) > limit:
+            exchanges = exchanges[:limit]
+            last = exchanges[-1]
+            return exchanges, encode_cursor(last.created_at.isoformat(), last.id)
+        return exchanges, None
+
+    async def accept(self, exchange_id: str, user_id: str, session: AsyncSession):
+        # Claim the request: concurrent accepts of the same request queue on
+        # this one row and all but the first see it is no longer pending
+        result = await session.execute(
+            update(ExchangeRequest)
+            .where(
+                ExchangeRequest.id == exchange_id,
+                ExchangeRequest.to_user_id == user_id,
+                ExchangeRequest.status == ExchangeStatus.pending,
+            )
+            .values(status=ExchangeStatus.accepted)
+            .returning(ExchangeRequest)
+        )
+        exchange = result.scalar_one_or_none()
+        if not exchange:
+            await session.rollback()
+            return None
+
+        # Lock both items without waiting; if another accept holds either one
+        # we lose the race immediately instead of queueing behind it
+        item_ids = sorted([exchange.item_from_id, exchange.item_to_id])
+        locked = await session.execute(
+            select(Item.id)
+            .where(
+                Item.id.in_(item_ids),
+                Item.is_available,
+                or_(
+                    and_(
+                        Item.id == exchange.item_from_id,
+                        Item.owner_id == exchange.from_user_id,
+                    ),
+                    and_(
+                        Item.id == exchange.item_to_id,
+                        Item.owner_id == exchange.to_user_id,
+                    ),
+                ),
+            )
+            .order_by(Item.id)
+            .with_for_update(skip_locked=True)
+        )
+        if len(locked.all()) != 2:
+            await session.rollback()
+            return False
+
+        await session.execute(
+            update(Item)
+            .where(Item.id.in_(item_ids))
+            .values(is_available=False, version=Item.version + 1)
+        )
+        # offers on either item can no longer be honoured
+        await session.execute(
+            update(ExchangeRequest)
+            .where(
+                ExchangeRequest.status == ExchangeStatus.pending,
+                or_(
+                    ExchangeRequest.item_from_id.in_(item_ids),
+                    ExchangeRequest.item_to_id.in_(item_ids),
+                ),
+            )
+            .values(status=ExchangeStatus.rejected)
+        )
+        await session.commit()
+        await invalidate_items(
+            item_ids=item_ids, owner_ids=[exchange.from_user_id, exchange.to_user_id]
+        )
+        await mark_swap_dirty(item_ids=item_ids)
+        return exchange
+
+    async def reject(
+        self, exchange_id: str, user_id: str, session: AsyncSession
+    ) -> ExchangeRequest | None:
+        return await self._close(
+            exchange_id,
+            ExchangeRequest.to_user_id == user_id,
+            ExchangeStatus.rejected,
+            session,
+        )
+
+    async def cancel(
+        self, exchange_id: str, user_id: str, session: AsyncSession
+    ) -> ExchangeRequest | None:
+        return await self._close(
+            exchange_id,
+            ExchangeRequest.from_user_id == user_id,
+            ExchangeStatus.cancelled,
+            session,
+        )
+
+    async def _close(self, exchange_id: str, party, status, session: AsyncSession):
+        result = await session.execute(
+            update(ExchangeRequest)
+            .where(
+                ExchangeRequest.id == exchange_id,
+                party,
+                ExchangeRequest.status == ExchangeStatus.pending,
+            )
+            .values(status=status)
+            .returning(ExchangeRequest)
+        )
+        exchange = result.scalar_one_or_none()
+        await session.commit()
+        return exchange
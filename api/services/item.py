@@ -1,66 +1,612 @@
-from sqlalchemy import select
+from sqlalchemy import cast, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import REGCONFIG, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from api.database.models import Item
-from typing import Sequence
-from api.schemas.item import ItemCreate, ItemUpdate
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from fastapi import UploadFile
+from api.core.cache import ReadThroughCache
+from api.core.conditional import collection_etag, http_date, resource_etag
+from api.core.config import Config
+from api.core.pagination import encode_cursor, decode_cursor
+from api.core.storage import store_upload
+from api.database.models import Item, ItemImage, WishlistItem
+from api.database.redis import mark_swap_dirty
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from typing import AsyncIterator, Callable, Iterable, Optional, Sequence
+from uuid import UUID
+from api.schemas.item import (
+    ItemCreate,
+    ItemImageRead,
+    ItemPage,
+    ItemRead,
+    ItemUpdate,
+)
+from api.tasks.images import process_image
+import asyncio
+
+
+item_cache = ReadThroughCache(
+    "items",
+    Config.ITEM_CACHE_TTL_SECONDS,
+    local_size=Config.ITEM_CACHE_LOCAL_SIZE,
+    local_ttl=Config.ITEM_CACHE_LOCAL_TTL_SECONDS,
+)
+
+
+async def invalidate_items(
+    item_ids: Iterable = (), owner_ids: Iterable = (), client=None
+):
+    # any item write can reshuffle the unfiltered listing, so "all" always goes
+    await item_cache.bump(
+        "all",
+        *(f"owner:{owner_id}" for owner_id in owner_ids),
+        *(f"item:{item_id}" for item_id in item_ids),
+        client=client,
+    )
+
+
+def _dump(item: Item) -> dict:
+    return ItemRead.model_validate(item).model_dump(mode="json")
+
+
+# exactly what ItemRead / ItemImageRead need, fetched as plain rows
+_ITEM_COLUMNS = tuple(
+    getattr(Item, name) for name in ItemRead.model_fields if name != "images"
+)
+_IMAGE_COLUMNS = tuple(getattr(ItemImage, name) for name in ItemImageRead.model_fields)
+
+
+def _render_page(items: list[dict], next_cursor: Optional[str]) -> str:
+    # validated and encoded by pydantic-core in one pass, no ORM objects and
+    # no intermediate JSON-ready dicts
+    page = ItemPage.model_validate({"items": items, "next_cursor": next_cursor})
+    return page.model_dump_json()
+
+
+async def _ndjson_lines(
+    chunks: AsyncIterator[bytes], max_bytes: int
+) -> AsyncIterator[Optional[bytes]]:
+    # Re-split an arbitrary chunked body into lines. An over-long line is
+    # dropped as it streams in and reported as None instead of buffered.
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            if oversized or len(buffer) + end - start > max_bytes:
+                yield None
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > max_bytes:
+                buffer.clear()
+                oversized = True
+
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, e['loc'])) or 'line'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def _validators(rows: Sequence[tuple], has_next: bool) -> dict:
+    # rows are (id, version). No Last-Modified for collections: the newest
+    # updated_at doesn't move when a member is deleted or drops out of the
+    # filter, so If-Modified-Since would answer 304 for a changed page; the
+    # ETag covers membership and versions.
+    return {
+        "etag": collection_etag(rows, has_next),
+        "last_modified": None,
+    }
+
+
+class ItemVersionConflict(Exception):
+    """The item exists and is ours, but not at the version the client expected."""
 
 
 class ItemService:
-    async def get_items(self, session: AsyncSession) -> Sequence[Item]:
-        result = await session.execute(select(Item))
-        items = result.scalars().all()
-        return items
+    async def get_items(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_available: Optional[bool] = None,
+        owner_id: Optional[str] = None,
+    ) -> dict:
+        if cursor:
+            # reject garbage before it becomes a cache key
+            decode_cursor(cursor, 1)
+
+        async def load():
+            statement = self._page_statement(
+                select(*_ITEM_COLUMNS), limit, cursor, is_available, owner_id
+            )
+            result = await session.execute(statement)
+            rows = result.all()
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1].id)
+
+            images = await self._images_by_item([r.id for r in rows], session)
+            items = [{**r._mapping, "images": images.get(r.id, [])} for r in rows]
+            return {
+                "body": _render_page(items, next_cursor),
+                **_validators(
+                    [(r.id, r.version) for r in rows],
+                    next_cursor is not None,
+                ),
+            }
+
+        return await item_cache.get_or_load(
+            f"owner:{owner_id}" if owner_id else "all",
+            f"page:{limit}:{is_available}:{cursor or ''}",
+            load,
+        )
+
+    async def _images_by_item(
+        self, item_ids: list[UUID], session: AsyncSession
+    ) -> dict[UUID, list[dict]]:
+        if not item_ids:
+            return {}
+        result = await session.execute(
+            select(ItemImage.item_id, *_IMAGE_COLUMNS)
+            .where(ItemImage.item_id.in_(item_ids))
+            .order_by(ItemImage.created_at)
+        )
+        images: dict[UUID, list[dict]] = {}
+        for item_id, *values in result.all():
+            images.setdefault(item_id, []).append(
+                dict(zip(ItemImageRead.model_fields, values))
+            )
+        return images
+
+    async def get_items_validators(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_available: Optional[bool] = None,
+        owner_id: Optional[str] = None,
+    ) -> dict:
+        # Same page as get_items, but only (id, version): an index-only
+        # scan, so revalidating never touches the heap
+        if cursor:
+            decode_cursor(cursor, 1)
+
+        async def load():
+            statement = self._page_statement(
+                select(Item.id, Item.version),
+                limit,
+                cursor,
+                is_available,
+                owner_id,
+            )
+            result = await session.execute(statement)
+            rows = result.all()
+            return _validators(rows[:limit], len(rows) > limit)
+
+        return await item_cache.get_or_load(
+            f"owner:{owner_id}" if owner_id else "all",
+            f"validators:{limit}:{is_available}:{cursor or ''}",
+            load,
+        )
+
+    def _page_statement(
+        self,
+        statement,
+        limit: int,
+        cursor: Optional[str],
+        is_available: Optional[bool],
+        owner_id: Optional[str],
+    ):
+        if is_available is not None:
+            statement = statement.where(Item.is_available == is_available)
+        if owner_id is not None:
+            statement = statement.where(Item.owner_id == owner_id)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, 1)
+            statement = statement.where(Item.id > UUID(last_id))
+
+        # one extra row tells us whether there is a next page
+        return statement.order_by(Item.id).limit(limit + 1)
+
+    async def search_items(
+        self,
+        query: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_available: Optional[bool] = None,
+    ) -> tuple[Sequence[Item], Optional[str]]:
+        # Full-text first; trigram similarity on the name only kicks in when
+        # the text search finds nothing (typos). The cursor remembers which.
+        mode, last_score, last_id = "fts", None, None
+        if cursor:
+            mode, last_score, last_id = decode_cursor(cursor, 3)
+            if mode not in ("fts", "trgm"):
+                raise ValueError("Invalid cursor")
+
+        if mode == "fts":
+            tsquery = func.websearch_to_tsquery(cast("english", REGCONFIG), query)
+            score = func.ts_rank_cd(Item.search_vector, tsquery)
+            statement = select(Item, score).where(
+                Item.search_vector.bool_op("@@")(tsquery)
+            )
+            items, next_cursor = await self._ranked_page(
+                "fts",
+                statement,
+                score,
+                session,
+                limit,
+                is_available,
+                last_score,
+                last_id,
+            )
+            if items or cursor:
+                return items, next_cursor
+
+        score = func.similarity(Item.name, query)
+        statement = select(Item, score).where(Item.name.bool_op("%")(query))
+        return await self._ranked_page(
+            "trgm", statement, score, session, limit, is_available, last_score, last_id
+        )
+
+    async def _ranked_page(
+        self,
+        mode: str,
+        statement,
+        score,
+        session: AsyncSession,
+        limit: int,
+        is_available: Optional[bool],
+        last_score: Optional[str],
+        last_id: Optional[str],
+    ) -> tuple[Sequence[Item], Optional[str]]:
+        if is_available is not None:
+            statement = statement.where(Item.is_available == is_available)
+        if last_id:
+            statement = statement.where(
+                tuple_(score, Item.id) < tuple_(float(last_score), UUID(last_id))
+            )
+
+        statement = (
+            statement.options(selectinload(Item.images))
+            .order_by(score.desc(), Item.id.desc())
+            .limit(limit + 1)
+        )
+        result = await session.execute(statement)
+        rows = result.all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_item, last_value = rows[-1]
+            next_cursor = encode_cursor(mode, repr(last_value), last_item.id)
+            return [row[0] for row in rows], next_cursor
+        return [row[0] for row in rows], None
 
     async def get_item_by_id(self, item_id: str, session: AsyncSession) -> Item | None:
-        statement = select(Item).where(Item.id == item_id)
+        statement = (
+            select(Item).options(selectinload(Item.images)).where(Item.id == item_id)
+        )
         result = await session.execute(statement)
         item = result.scalar_one_or_none()
         return item
 
+    async def get_item(self, item_id: str, session: AsyncSession) -> dict | None:
+        # cached read-only view; writes go through get_item_by_id
+        async def load():
+            item = await self.get_item_by_id(item_id, session)
+            return _dump(item) if item else None
+
+        return await item_cache.get_or_load(f"item:{item_id}", "", load)
+
+    async def get_item_validators(
+        self, item_id: str, session: AsyncSession
+    ) -> dict | None:
+        async def load():
+            result = await session.execute(
+                select(Item.version, Item.updated_at).where(Item.id == item_id)
+            )
+            row = result.one_or_none()
+            if row is None:
+                return None
+            return {
+                "etag": resource_etag(row.version),
+                "last_modified": http_date(row.updated_at),
+            }
+
+        return await item_cache.get_or_load(f"item:{item_id}", "validators", load)
+
     async def get_items_by_user_id(
-        self, user_id: str, session: AsyncSession
-    ) -> Sequence[Item]:
-        statement = select(Item).where(Item.owner_id == user_id)
-        result = await session.execute(statement)
-        items = result.scalars().all()
-        return items
+        self,
+        user_id: str,
+        session: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        is_available: Optional[bool] = None,
+    ) -> dict:
+        return await self.get_items(
+            session,
+            limit,
+            cursor=cursor,
+            is_available=is_available,
+            owner_id=user_id,
+        )
 
     async def create_item(self, user_id: str, data: ItemCreate, session: AsyncSession):
-        item = Item(
-            name=data.name,
-            description=data.description,
-            owner_id=user_id,
+        result = await session.execute(
+            insert(Item)
+            .values(name=data.name, description=data.description, owner_id=user_id)
+            .returning(Item)
         )
-        session.add(item)
+        item = result.scalar_one()
+        # brand new, nothing to load; keeps ItemRead from lazy-loading
+        set_committed_value(item, "images", [])
         await session.commit()
-        await session.refresh(item)
+        await invalidate_items(item_ids=[item.id], owner_ids=[user_id])
         return item
 
     async def update_item(
-        self, item_id: str, item_data: ItemUpdate, session: AsyncSession
+        self,
+        item_id: str,
+        user_id: str,
+        item_data: ItemUpdate,
+        session: AsyncSession,
+        versions: Optional[list[int]] = None,
     ):
-        item = await self.get_item_by_id(item_id, session)
-
-        if not item:
-            return None
+        # Ownership and the If-Match versions are part of the UPDATE itself,
+        # so a concurrent writer can't slip in between a check and the write
+        values = item_data.model_dump(exclude_unset=True)
+        statement = update(Item).where(Item.id == item_id, Item.owner_id == user_id)
+        if versions is not None:
+            statement = statement.where(Item.version.in_(versions))
 
-        item_data_dict = item_data.model_dump(exclude_unset=True)
+        result = await session.execute(
+            statement.values(**values, version=Item.version + 1).returning(Item)
+        )
+        item = result.scalar_one_or_none()
 
-        for k, v in item_data_dict.items():
-            setattr(item, k, v)
+        if item is None:
+            await session.rollback()
+            owned = await self._ownership(item_id, user_id, session)
+            if owned:
+                raise ItemVersionConflict()
+            return owned
 
         await session.commit()
-        await session.refresh(item)
+        await invalidate_items(item_ids=[item_id], owner_ids=[item.owner_id])
         return item
 
     async def delete_item(self, item_id: str, user_id: str, session: AsyncSession):
-        item = await self.get_item_by_id(item_id, session)
-        if not item:
+        # One statement that also returns the wishers: the delete cascades to
+        # their wishlist rows, and their edges to this item have to leave the
+        # swap graph. The outer SELECT still sees the rows the cascade removes.
+        gone = (
+            delete(Item)
+            .where(Item.id == item_id, Item.owner_id == user_id)
+            .returning(Item.id)
+            .cte("gone")
+        )
+        result = await session.execute(
+            select(gone.c.id, WishlistItem.user_id).outerjoin(
+                WishlistItem, WishlistItem.item_id == gone.c.id
+            )
+        )
+        rows = result.all()
+        if not rows:
+            await session.rollback()
+            owned = await self._ownership(item_id, user_id, session)
+            return False if owned is False else None
+
+        wishers = [wisher for _, wisher in rows if wisher is not None]
+        await session.commit()
+        await invalidate_items(item_ids=[item_id], owner_ids=[user_id])
+        await mark_swap_dirty(user_ids=wishers)
+        return True
+
+    async def add_image(
+        self, item_id: str, user_id: str, upload: UploadFile, session: AsyncSession
+    ):
+        owned = await self._ownership(item_id, user_id, session)
+        if not owned:
+            return owned
+
+        stored = await store_upload(upload)
+
+        # images are part of the item's representation, so its version moves
+        result = await session.execute(
+            update(Item)
+            .where(Item.id == item_id, Item.owner_id == user_id)
+            .values(version=Item.version + 1)
+            .returning(Item.id)
+        )
+        if result.scalar_one_or_none() is None:
+            # deleted or handed over while the upload was streaming
+            await session.rollback()
             return None
 
-        if str(item.owner_id) != user_id:
-            return False
+        result = await session.execute(
+            pg_insert(ItemImage)
+            .values(
+                item_id=item_id,
+                image_url=stored.url,
+                sha256=stored.sha256,
+                content_type=stored.content_type,
+            )
+            .on_conflict_do_nothing(index_elements=["item_id", "sha256"])
+            .returning(ItemImage)
+        )
+        image = result.scalar_one_or_none()
+        if image is None:
+            # same bytes already attached to this item: nothing changed
+            await session.rollback()
+            result = await session.execute(
+                select(ItemImage).where(
+                    ItemImage.item_id == item_id, ItemImage.sha256 == stored.sha256
+                )
+            )
+            return result.scalar_one()
 
-        await session.delete(item)
         await session.commit()
+        await invalidate_items(item_ids=[item_id], owner_ids=[user_id])
+        # resizing is CPU work for the worker pool, never the request
+        await asyncio.to_thread(process_image.delay, stored.sha256, stored.extension)
+        return image
+
+    async def remove_image(
+        self, item_id: str, image_id: str, user_id: str, session: AsyncSession
+    ):
+        # Stored files stay: other items may share the same content hash
+        result = await session.execute(
+            delete(ItemImage)
+            .where(
+                ItemImage.id == image_id,
+                ItemImage.item_id == item_id,
+                ItemImage.item_id.in_(
+                    select(Item.id).where(Item.owner_id == user_id)
+                ),
+            )
+            .returning(ItemImage.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await session.rollback()
+            owned = await self._ownership(item_id, user_id, session)
+            return False if owned is False else None
+
+        await session.execute(
+            update(Item).where(Item.id == item_id).values(version=Item.version + 1)
+        )
+        await session.commit()
+        await invalidate_items(item_ids=[item_id], owner_ids=[user_id])
         return True
+
+    async def export_items(
+        self,
+        session: AsyncSession,
+        is_available: Optional[bool] = None,
+        owner_id: Optional[str] = None,
+    ) -> AsyncIterator[Sequence]:
+        """Yield partitions of rows from a server-side cursor, in id order.
+
+        Only one partition is alive at a time, so memory stays flat no matter
+        how large the catalog is.
+        """
+        statement = select(
+            Item.id,
+            Item.name,
+            Item.description,
+            Item.owner_id,
+            Item.is_available,
+            Item.version,
+            Item.updated_at,
+        )
+        if is_available is not None:
+            statement = statement.where(Item.is_available == is_available)
+        if owner_id is not None:
+            statement = statement.where(Item.owner_id == owner_id)
+
+        result = await session.stream(
+            statement.order_by(Item.id).execution_options(
+                yield_per=Config.ITEMS_EXPORT_CHUNK_SIZE
+            )
+        )
+        async for partition in result.partitions():
+            yield partition
+
+    async def import_items(
+        self, user_id: str, body: AsyncIterator[bytes], session: AsyncSession
+    ) -> dict:
+        """Bulk insert a streamed NDJSON body of items for user_id.
+
+        Bad lines are reported and skipped; a batch the database refuses is
+        retried row by row so one bad row only costs itself.
+        """
+        report = {"inserted": 0, "failed": 0, "errors": []}
+
+        def fail(line_number: int, error: str):
+            report["failed"] += 1
+            if len(report["errors"]) < Config.ITEMS_IMPORT_MAX_ERRORS:
+                report["errors"].append({"line": line_number, "error": error})
+
+        batch: list[tuple[int, dict]] = []
+        line_number = 0
+        lines = _ndjson_lines(body, Config.ITEMS_IMPORT_MAX_LINE_BYTES)
+        async for line in lines:
+            line_number += 1
+            if line is None:
+                fail(line_number, "line too long")
+                continue
+            if not line.strip():
+                continue
+            try:
+                data = ItemCreate.model_validate_json(line)
+            except ValidationError as e:
+                fail(line_number, _describe(e))
+                continue
+
+            row = {"name": data.name, "description": data.description}
+            batch.append((line_number, row))
+            if len(batch) >= Config.ITEMS_IMPORT_BATCH_SIZE:
+                await self._insert_batch(user_id, batch, session, fail, report)
+                batch = []
+
+        await self._insert_batch(user_id, batch, session, fail, report)
+        if report["inserted"]:
+            await invalidate_items(owner_ids=[user_id])
+        return report
+
+    async def _insert_batch(
+        self,
+        user_id: str,
+        batch: list[tuple[int, dict]],
+        session: AsyncSession,
+        fail: Callable[[int, str], None],
+        report: dict,
+    ):
+        if not batch:
+            return
+
+        rows = [{**row, "owner_id": user_id} for _, row in batch]
+        try:
+            # executemany -> multi-row INSERT ... VALUES batches
+            await session.execute(insert(Item), rows)
+            await session.commit()
+            report["inserted"] += len(rows)
+            return
+        except DBAPIError:
+            await session.rollback()
+
+        for (line_number, _), row in zip(batch, rows):
+            try:
+                await session.execute(insert(Item), [row])
+                await session.commit()
+                report["inserted"] += 1
+            except DBAPIError as e:
+                await session.rollback()
+                fail(line_number, str(e.orig))
+
+    async def _ownership(
+        self, item_id: str, user_id: str, session: AsyncSession
+    ) -> Optional[bool]:
+        # Only failed writes pay for finding out why: None when the item is
+        # gone, otherwise whether it belongs to user_id
+        result = await session.execute(select(Item.owner_id).where(Item.id == item_id))
+        owner_id = result.scalar_one_or_none()
+        if owner_id is None:
+            return None
+        return str(owner_id) == user_id
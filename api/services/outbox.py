@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Awaitable, Callable
+import asyncio
+from api.core.config import Config
+from api.database.models import EmailOutbox
+
+
+async def enqueue_email(
+    session: AsyncSession, recipients: list[str], subject: str, body: str
+) -> None:
+    """Add an email to the caller's transaction; it goes out once that commits."""
+    await session.execute(
+        insert(EmailOutbox).values(recipients=recipients, subject=subject, body=body)
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2**attempts * 5, 3600))
+
+
+async def drain_outbox(
+    session_factory: async_sessionmaker,
+    send: Callable[[EmailOutbox], Awaitable[None]],
+    batch_size: int = Config.OUTBOX_BATCH_SIZE,
+) -> int:
+    """Send due outbox rows until none are left; returns how many went out.
+
+    Rows are claimed with SKIP LOCKED, so several dispatchers can drain the
+    same table without handing out an email twice. Sent rows are deleted in
+    the claiming transaction; failures are pushed back with a backoff and
+    left in place for inspection after OUTBOX_MAX_ATTEMPTS.
+    """
+    delivered = 0
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(
+                select(EmailOutbox)
+                .where(
+                    EmailOutbox.next_attempt_at <= datetime.now(tz=timezone.utc),
+                    EmailOutbox.attempts < Config.OUTBOX_MAX_ATTEMPTS,
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                return delivered
+
+            outcomes = await asyncio.gather(
+                *(send(row) for row in rows), return_exceptions=True
+            )
+
+            now = datetime.now(tz=timezone.utc)
+            sent = []
+            for row, outcome in zip(rows, outcomes):
+                if isinstance(outcome, Exception):
+                    row.attempts += 1
+                    row.last_error = repr(outcome)[:1000]
+                    row.next_attempt_at = now + _retry_delay(row.attempts)
+                else:
+                    sent.append(row.id)
+
+            if sent:
+                await session.execute(
+                    delete(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+            delivered += len(sent)
+
+        if len(rows) < batch_size:
+            return delivered
@@ -0,0 +1,551 @@
+from array import array
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from api.database.models import (
+    Item,
+    SwapLeg,
+    SwapStatus,
+    SwapSuggestion,
+    WishlistItem,
+)
+from api.database.redis import mark_swap_dirty
+from api.services.item import invalidate_items
+from typing import Container, Iterable, Optional, Sequence
+from uuid import UUID, uuid4
+
+
+class TradeGraph:
+    """Compact "wants" graph: an edge u -> v labelled i means user u wants
+    item i, which user v owns and still has available.
+
+    Users and items are interned to dense ints and edges live in CSR arrays
+    (targets[offsets[u]:offsets[u + 1]]), with a reverse CSR of predecessors
+    to bound the cycle search. Incremental updates go to small per-user
+    overlays that compact() folds back in.
+    """
+
+    def __init__(self):
+        self.users: list[UUID] = []
+        self.user_index: dict[UUID, int] = {}
+        self.items: list[UUID] = []
+        self.item_index: dict[UUID, int] = {}
+        self.offsets = array("q", [0])
+        self.targets = array("q")
+        self.edge_items = array("q")
+        self.overlay: dict[int, tuple[array, array]] = {}
+        self.reverse_offsets = array("q", [0])
+        self.sources = array("q")
+        self.reverse_overlay: dict[int, list[int]] = {}
+        self._sources = array("q")
+        self._staged_targets = array("q")
+        self._staged_items = array("q")
+
+    def node(self, user_id: UUID) -> int:
+        index = self.user_index.get(user_id)
+        if index is None:
+            index = self.user_index[user_id] = len(self.users)
+            self.users.append(user_id)
+        return index
+
+    def item(self, item_id: UUID) -> int:
+        index = self.item_index.get(item_id)
+        if index is None:
+            index = self.item_index[item_id] = len(self.items)
+            self.items.append(item_id)
+        return index
+
+    def add_edges(self, rows: Iterable[tuple[UUID, UUID, UUID]]):
+        # rows: (wisher, owner, item); staged until freeze() builds the CSR
+        for wisher, owner, item in rows:
+            self._sources.append(self.node(wisher))
+            self._staged_targets.append(self.node(owner))
+            self._staged_items.append(self.item(item))
+
+    def freeze(self):
+        # counting sort of the staged edges by source node
+        offsets = array("q", [0]) * (len(self.users) + 1)
+        for u in self._sources:
+            offsets[u + 1] += 1
+        for u in range(len(self.users)):
+            offsets[u + 1] += offsets[u]
+
+        positions = array("q", offsets)
+        targets = array("q", [0]) * len(self._sources)
+        edge_items = array("q", [0]) * len(self._sources)
+        for source, target, item in zip(
+            self._sources, self._staged_targets, self._staged_items
+        ):
+            position = positions[source]
+            targets[position] = target
+            edge_items[position] = item
+            positions[source] = position + 1
+
+        reverse_offsets = array("q", [0]) * (len(self.users) + 1)
+        for v in targets:
+            reverse_offsets[v + 1] += 1
+        for v in range(len(self.users)):
+            reverse_offsets[v + 1] += reverse_offsets[v]
+
+        positions = array("q", reverse_offsets)
+        sources = array("q", [0]) * len(targets)
+        for u in range(len(self.users)):
+            for k in range(offsets[u], offsets[u + 1]):
+                position = positions[targets[k]]
+                sources[position] = u
+                positions[targets[k]] = position + 1
+
+        self.offsets, self.targets, self.edge_items = offsets, targets, edge_items
+        self.reverse_offsets, self.sources = reverse_offsets, sources
+        self._sources = array("q")
+        self._staged_targets = array("q")
+        self._staged_items = array("q")
+        self.overlay.clear()
+        self.reverse_overlay.clear()
+
+    def edges(self, u: int) -> tuple[Sequence[int], Sequence[int]]:
+        if u in self.overlay:
+            return self.overlay[u]
+        if u + 1 >= len(self.offsets):
+            return (), ()
+        start, end = self.offsets[u], self.offsets[u + 1]
+        return self.targets[start:end], self.edge_items[start:end]
+
+    def predecessors(self, v: int) -> Sequence[int]:
+        if v in self.reverse_overlay:
+            return self.reverse_overlay[v]
+        if v + 1 >= len(self.reverse_offsets):
+            return ()
+        return self.sources[self.reverse_offsets[v] : self.reverse_offsets[v + 1]]
+
+    def has_edge(self, u: int, v: int, item: int) -> bool:
+        targets, items = self.edges(u)
+        return any(t == v and i == item for t, i in zip(targets, items))
+
+    def replace_edges(self, wisher: UUID, rows: Iterable[tuple[UUID, UUID]]):
+        # rows: (owner, item) for everything the wisher currently wants
+        u = self.node(wisher)
+        old_targets, _ = self.edges(u)
+
+        targets, items = array("q"), array("q")
+        for owner, item in rows:
+            targets.append(self.node(owner))
+            items.append(self.item(item))
+        self.overlay[u] = (targets, items)
+
+        # keep the predecessor lists of every touched target in step
+        for v in set(old_targets) | set(targets):
+            if v not in self.reverse_overlay:
+                self.reverse_overlay[v] = list(self.predecessors(v))
+            predecessors = [w for w in self.reverse_overlay[v] if w != u]
+            predecessors.extend(u for t in set(targets) if t == v)
+            self.reverse_overlay[v] = predecessors
+
+    def compact(self):
+        # fold the overlay back into the CSR arrays
+        for u in range(len(self.users)):
+            targets, items = self.edges(u)
+            self._sources.extend([u] * len(targets))
+            self._staged_targets.extend(targets)
+            self._staged_items.extend(items)
+        self.freeze()
+
+    def find_cycles(
+        self,
+        starts: Iterable[int],
+        blocked: set[int],
+        max_length: int,
+        budget: int,
+        rejected: Container[frozenset[tuple[int, int, int]]] = frozenset(),
+    ) -> list[list[tuple[int, int, int]]]:
+        """Greedy, vertex-disjoint cycles through the given start nodes.
+
+        Returns each cycle as (receiver, giver, item) legs. Nodes in blocked
+        (already in a pending suggestion) are never used and every node found
+        in a cycle is added to blocked. A cycle whose set of legs is in
+        rejected is skipped and the search goes on.
+        """
+        cycles = []
+        for start in starts:
+            if start in blocked:
+                continue
+
+            # hops back to start for every node that can close a short cycle;
+            # the forward search never leaves this ball
+            distance = {start: 0}
+            frontier = [start]
+            for hops in range(1, max_length):
+                reached = []
+                for v in frontier:
+                    for w in self.predecessors(v):
+                        if w not in distance and w not in blocked:
+                            distance[w] = hops
+                            reached.append(w)
+                frontier = reached
+            if len(distance) == 1:
+                continue
+
+            path = [start]
+            path_items: list[int] = []
+            on_path = {start}
+            stack = [iter(zip(*self.edges(start)))]
+            expansions = 0
+
+            while stack and expansions < budget:
+                step = next(stack[-1], None)
+                if step is None:
+                    stack.pop()
+                    on_path.discard(path.pop())
+                    if path_items:
+                        path_items.pop()
+                    continue
+
+                target, item = step
+                expansions += 1
+                if target == start and len(path) >= 2:
+                    path_items.append(item)
+                    cycle = [
+                        (path[k], path[(k + 1) % len(path)], path_items[k])
+                        for k in range(len(path))
+                    ]
+                    if frozenset(cycle) in rejected:
+                        path_items.pop()
+                        continue
+                    cycles.append(cycle)
+                    blocked.update(path)
+                    break
+
+                hops = distance.get(target)
+                if hops is None or target in on_path or len(path) + hops > max_length:
+                    continue
+
+                path.append(target)
+                path_items.append(item)
+                on_path.add(target)
+                stack.append(iter(zip(*self.edges(target))))
+
+        return cycles
+
+
+def _edges_statement():
+    return (
+        select(WishlistItem.user_id, Item.owner_id, WishlistItem.item_id)
+        .join(Item, Item.id == WishlistItem.item_id)
+        .where(Item.is_available, Item.owner_id != WishlistItem.user_id)
+    )
+
+
+class SwapService:
+    # wishlist
+
+    async def add_to_wishlist(
+        self, user_id: str, item_id: str, session: AsyncSession
+    ) -> bool:
+        try:
+            await session.execute(
+                pg_insert(WishlistItem)
+                .values(user_id=user_id, item_id=item_id)
+                .on_conflict_do_nothing()
+            )
+            await session.commit()
+        except IntegrityError:
+            # unknown item
+            await session.rollback()
+            return False
+
+        await mark_swap_dirty(user_ids=[user_id])
+        return True
+
+    async def remove_from_wishlist(
+        self, user_id: str, item_id: str, session: AsyncSession
+    ) -> bool:
+        result = await session.execute(
+            delete(WishlistItem)
+            .where(WishlistItem.user_id == user_id, WishlistItem.item_id == item_id)
+            .returning(WishlistItem.item_id)
+        )
+        removed = result.scalar_one_or_none() is not None
+        await session.commit()
+        if removed:
+            await mark_swap_dirty(user_ids=[user_id])
+        return removed
+
+    async def get_wishlist(self, user_id: str, session: AsyncSession) -> Sequence[Item]:
+        result = await session.execute(
+            select(Item)
+            .join(WishlistItem, WishlistItem.item_id == Item.id)
+            .where(WishlistItem.user_id == user_id)
+            .order_by(WishlistItem.created_at.desc())
+        )
+        return result.scalars().all()
+
+    # matching job
+
+    async def load_graph(self, session: AsyncSession) -> TradeGraph:
+        # streamed from a server-side cursor so the job never holds the raw
+        # result set and the graph at the same time
+        result = await session.stream(
+            _edges_statement().execution_options(yield_per=10000)
+        )
+        graph = TradeGraph()
+        async for partition in result.partitions():
+            graph.add_edges(partition)
+        graph.freeze()
+        return graph
+
+    async def wishers_of(
+        self, item_ids: Iterable[str], session: AsyncSession
+    ) -> set[UUID]:
+        result = await session.execute(
+            select(WishlistItem.user_id).where(
+                WishlistItem.item_id.in_([UUID(i) for i in item_ids])
+            )
+        )
+        return set(result.scalars().all())
+
+    async def reload_edges(
+        self, graph: TradeGraph, user_ids: set[UUID], session: AsyncSession
+    ):
+        result = await session.execute(
+            _edges_statement().where(WishlistItem.user_id.in_(user_ids))
+        )
+        edges: dict[UUID, list[tuple[UUID, UUID]]] = {u: [] for u in user_ids}
+        for wisher, owner, item in result:
+            edges[wisher].append((owner, item))
+
+        for wisher, rows in edges.items():
+            graph.replace_edges(wisher, rows)
+
+    async def expire_invalid(
+        self,
+        graph: TradeGraph,
+        session: AsyncSession,
+        receivers: Optional[set[UUID]] = None,
+    ) -> set[UUID]:
+        """Expire pending suggestions whose legs are no longer backed by the
+        graph. Only suggestions touching `receivers` are checked unless None.
+        Returns the users freed up by expiry."""
+        statement = (
+            select(SwapSuggestion.id, SwapSuggestion.size, SwapLeg)
+            .join(SwapLeg, SwapLeg.suggestion_id == SwapSuggestion.id)
+            .where(SwapSuggestion.status == SwapStatus.pending)
+        )
+        if receivers is not None:
+            touched = select(SwapLeg.suggestion_id).where(
+                SwapLeg.receiver_id.in_(receivers)
+            )
+            statement = statement.where(SwapSuggestion.id.in_(touched))
+
+        result = await session.execute(statement)
+        suggestions: dict[UUID, tuple[int, list[SwapLeg]]] = {}
+        for suggestion_id, size, leg in result:
+            suggestions.setdefault(suggestion_id, (size, []))[1].append(leg)
+
+        expired, freed = [], set()
+        for suggestion_id, (size, legs) in suggestions.items():
+            valid = len(legs) == size and all(
+                leg.receiver_id in graph.user_index
+                and leg.giver_id in graph.user_index
+                and leg.item_id in graph.item_index
+                and graph.has_edge(
+                    graph.user_index[leg.receiver_id],
+                    graph.user_index[leg.giver_id],
+                    graph.item_index[leg.item_id],
+                )
+                for leg in legs
+            )
+            if not valid:
+                expired.append(suggestion_id)
+                freed.update(leg.receiver_id for leg in legs)
+
+        if expired:
+            await session.execute(
+                update(SwapSuggestion)
+                .where(SwapSuggestion.id.in_(expired))
+                .values(status=SwapStatus.expired)
+            )
+        return freed
+
+    async def pending_participants(self, session: AsyncSession) -> set[UUID]:
+        result = await session.execute(
+            select(SwapLeg.receiver_id)
+            .join(SwapSuggestion, SwapSuggestion.id == SwapLeg.suggestion_id)
+            .where(SwapSuggestion.status == SwapStatus.pending)
+        )
+        return set(result.scalars().all())
+
+    async def rejected_cycles(
+        self, graph: TradeGraph, session: AsyncSession
+    ) -> set[frozenset[tuple[int, int, int]]]:
+        """Leg sets of rejected suggestions, as graph (receiver, giver, item)
+        triples. Cycles the graph can no longer contain are left out."""
+        result = await session.execute(
+            select(
+                SwapLeg.suggestion_id,
+                SwapLeg.receiver_id,
+                SwapLeg.giver_id,
+                SwapLeg.item_id,
+            )
+            .join(SwapSuggestion, SwapSuggestion.id == SwapLeg.suggestion_id)
+            .where(SwapSuggestion.status == SwapStatus.rejected)
+        )
+        suggestions: dict[UUID, list[tuple[UUID, UUID, UUID]]] = {}
+        for suggestion_id, *leg in result:
+            suggestions.setdefault(suggestion_id, []).append(tuple(leg))
+
+        users, items = graph.user_index, graph.item_index
+        return {
+            frozenset((users[r], users[g], items[i]) for r, g, i in legs)
+            for legs in suggestions.values()
+            if all(r in users and g in users and i in items for r, g, i in legs)
+        }
+
+    async def save_suggestions(
+        self,
+        graph: TradeGraph,
+        cycles: list[list[tuple[int, int, int]]],
+        session: AsyncSession,
+    ):
+        if not cycles:
+            return
+
+        suggestions, legs = [], []
+        for cycle in cycles:
+            suggestion_id = uuid4()
+            suggestions.append(
+                {"id": suggestion_id, "status": SwapStatus.pending, "size": len(cycle)}
+            )
+            legs.extend(
+                {
+                    "suggestion_id": suggestion_id,
+                    "receiver_id": graph.users[receiver],
+                    "giver_id": graph.users[giver],
+                    "item_id": graph.items[item],
+                    "accepted": False,
+                }
+                for receiver, giver, item in cycle
+            )
+
+        await session.execute(insert(SwapSuggestion), suggestions)
+        await session.execute(insert(SwapLeg), legs)
+
+    # user actions
+
+    async def get_suggestions(
+        self, user_id: str, session: AsyncSession
+    ) -> Sequence[SwapSuggestion]:
+        mine = select(SwapLeg.suggestion_id).where(SwapLeg.receiver_id == user_id)
+        result = await session.execute(
+            select(SwapSuggestion)
+            .options(selectinload(SwapSuggestion.legs))
+            .where(
+                SwapSuggestion.id.in_(mine),
+                SwapSuggestion.status == SwapStatus.pending,
+            )
+            .order_by(SwapSuggestion.created_at.desc())
+        )
+        return result.scalars().all()
+
+    async def accept(self, suggestion_id: str, user_id: str, session: AsyncSession):
+        # Lock the suggestion so the last two acceptors can't both miss
+        # each other's accept and leave the cycle hanging
+        result = await session.execute(
+            select(SwapSuggestion.size)
+            .where(
+                SwapSuggestion.id == suggestion_id,
+                SwapSuggestion.status == SwapStatus.pending,
+            )
+            .with_for_update()
+        )
+        size = result.scalar_one_or_none()
+        if size is None:
+            await session.rollback()
+            return None
+
+        result = await session.execute(
+            update(SwapLeg)
+            .where(
+                SwapLeg.suggestion_id == suggestion_id,
+                SwapLeg.receiver_id == user_id,
+            )
+            .values(accepted=True)
+            .returning(SwapLeg.receiver_id)
+        )
+        if result.scalar_one_or_none() is None:
+            await session.rollback()
+            return None
+
+        result = await session.execute(
+            select(func.count())
+            .select_from(SwapLeg)
+            .where(SwapLeg.suggestion_id == suggestion_id, ~SwapLeg.accepted)
+        )
+        if result.scalar_one() > 0:
+            await session.commit()
+            return SwapStatus.pending
+
+        # everyone is in: flip all items at once, only if all are still ours
+        result = await session.execute(
+            update(Item)
+            .where(
+                Item.id == SwapLeg.item_id,
+                Item.owner_id == SwapLeg.giver_id,
+                Item.is_available,
+                SwapLeg.suggestion_id == suggestion_id,
+            )
+            .values(is_available=False, version=Item.version + 1)
+            .returning(Item.id, Item.owner_id)
+        )
+        flipped = result.all()
+        if len(flipped) != size:
+            await session.rollback()
+            await session.execute(
+                update(SwapSuggestion)
+                .where(SwapSuggestion.id == suggestion_id)
+                .values(status=SwapStatus.expired)
+            )
+            await session.commit()
+            return False
+
+        await session.execute(
+            update(SwapSuggestion)
+            .where(SwapSuggestion.id == suggestion_id)
+            .values(status=SwapStatus.accepted)
+        )
+        await session.commit()
+        item_ids = [item_id for item_id, _ in flipped]
+        await invalidate_items(
+            item_ids=item_ids, owner_ids=[owner_id for _, owner_id in flipped]
+        )
+        await mark_swap_dirty(item_ids=item_ids)
+        return SwapStatus.accepted
+
+    async def reject(
+        self, suggestion_id: str, user_id: str, session: AsyncSession
+    ) -> bool:
+        mine = select(SwapLeg.suggestion_id).where(SwapLeg.receiver_id == user_id)
+        result = await session.execute(
+            update(SwapSuggestion)
+            .where(
+                SwapSuggestion.id == suggestion_id,
+                SwapSuggestion.id.in_(mine),
+                SwapSuggestion.status == SwapStatus.pending,
+            )
+            .values(status=SwapStatus.rejected, rejected_by=user_id)
+            .returning(SwapSuggestion.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await session.rollback()
+            return False
+
+        result = await session.execute(
+            select(SwapLeg.receiver_id).where(SwapLeg.suggestion_id == suggestion_id)
+        )
+        participants = result.scalars().all()
+        await session.commit()
+        # everyone in the cycle is free again; the next run looks for other
+        # trades for them, never this exact cycle
+        await mark_swap_dirty(user_ids=participants)
+        return True
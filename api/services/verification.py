@@ -1,70 +1,191 @@
-from uuid import uuid4
+from uuid import UUID, uuid4
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
 from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from time import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import delete, insert, or_, select, update
 from api.database.models import EmailVerification, User
 from api.core.config import Config
-from api.tasks.send_email import send_verification_email
+from api.services.outbox import enqueue_email
 from typing import Optional
 from api.database import async_session
+from api.database.redis import claim_verification_token, invalidate_principal
+import hmac
 
 
 def generate_token() -> str:
     return uuid4().hex  # 32 chars, URL safe
 
 
-async def create_verification_for_user(user_id: str) -> EmailVerification:
+# Signed mode: user id (16 bytes) + expiry (8 bytes) + HMAC-SHA256 of both,
+# base64url. Nothing is stored until the token is used.
+_SIGNED_PAYLOAD_SIZE = 24
+_SIGNED_TOKEN_SIZE = _SIGNED_PAYLOAD_SIZE + sha256().digest_size
+
+
+def _sign(payload: bytes) -> bytes:
+    # domain-separated, so no other HMAC made with this secret verifies here
+    message = b"email-verification:" + payload
+    return hmac.new(Config.JWT_SECRET.encode(), message, sha256).digest()
+
+
+def generate_signed_token(user_id) -> str:
+    expires_at = int(time()) + Config.VERIFICATION_TOKEN_EXPIRE_HOURS * 3600
+    payload = UUID(str(user_id)).bytes + expires_at.to_bytes(8, "big")
+    return urlsafe_b64encode(payload + _sign(payload)).rstrip(b"=").decode()
+
+
+def read_signed_token(token: str) -> Optional[tuple[UUID, int]]:
+    """(user id, expiry) of a valid, unexpired signed token, else None."""
+    try:
+        raw = urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (Base64Error, ValueError):
+        return None
+    if len(raw) != _SIGNED_TOKEN_SIZE:
+        return None
+
+    payload, signature = raw[:_SIGNED_PAYLOAD_SIZE], raw[_SIGNED_PAYLOAD_SIZE:]
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    expires_at = int.from_bytes(payload[16:], "big")
+    if expires_at < time():
+        return None
+    return UUID(bytes=payload[:16]), expires_at
+
+
+async def issue_verification(
+    user_id, session: AsyncSession, invalidate_previous: bool = True
+) -> str:
+    """Mint a token; in table mode its row joins the caller's transaction.
+
+    Committing is up to the caller. Signed tokens touch no table at all, and
+    an earlier one stays valid until used or expired: every token for a user
+    goes to the same address and verifies the same thing.
+    """
+    if Config.VERIFICATION_TOKEN_MODE == "signed":
+        return generate_signed_token(user_id)
+
+    if invalidate_previous:
+        await session.execute(
+            update(EmailVerification)
+            .where(EmailVerification.user_id == user_id)
+            .values(used=True)
+        )
+    expires_at = datetime.now(tz=timezone.utc) + timedelta(
+        hours=Config.VERIFICATION_TOKEN_EXPIRE_HOURS
+    )
+    token = generate_token()
+    await session.execute(
+        insert(EmailVerification).values(
+            token=token, user_id=user_id, expires_at=expires_at
+        )
+    )
+    return token
+
+
+async def create_verification_for_user(user_id: str, user_email: str) -> str:
     async with async_session() as session:
         try:
-            # invalidate old tokens for this user:
-            await session.execute(
-                update(EmailVerification)
-                .where(EmailVerification.user_id == user_id)
-                .values(used=True)
-            )
-            token = generate_token()
-            expires_at = datetime.now(tz=timezone.utc) + timedelta(
-                hours=Config.VERIFICATION_TOKEN_EXPIRE_HOURS
-            )
-            ev = EmailVerification(token=token, user_id=user_id, expires_at=expires_at)
-            session.add(ev)
+            token = await issue_verification(user_id, session)
+            await queue_verification_email(user_email, token, session)
             await session.commit()
-            await session.refresh(ev)
-            return ev
+            return token
         finally:
             await session.close()
 
 
-def send_verification_email_bg(user_email: str, token: str):
+async def queue_verification_email(user_email: str, token: str, session: AsyncSession):
+    # written in the caller's transaction; the outbox dispatcher sends it
     link = f"{Config.FRONTEND_URL.rstrip('/')}/auth/verify-email?token={token}"
     html = f"<p>Click to verify: <a href='{link}'>{link}</a></p>"
     subject = "Verify your email"
 
-    send_verification_email.delay([user_email], subject, html)  # type: ignore
+    await enqueue_email(session, [user_email], subject, html)
+
+
+async def _claim_table_token(token: str, session: AsyncSession) -> Optional[UUID]:
+    # check and mark used in one statement, so a token can't be spent twice
+    result = await session.execute(
+        update(EmailVerification)
+        .where(
+            EmailVerification.token == token,
+            EmailVerification.used.is_(False),
+            EmailVerification.expires_at >= datetime.now(tz=timezone.utc),
+        )
+        .values(used=True)
+        .returning(EmailVerification.user_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _claim_signed_token(token: str) -> Optional[UUID]:
+    claims = read_signed_token(token)
+    if claims is None:
+        return None
+    user_id, expires_at = claims
+    # single use: the Redis marker lives exactly as long as the token would
+    if not await claim_verification_token(token, expires_at):
+        return None
+    return user_id
 
 
 async def verify_token_and_activate(
     token: str, session: AsyncSession
 ) -> Optional[User]:
-    statement = select(EmailVerification).where(EmailVerification.token == token)
-    result = await session.execute(statement)
-    ev = result.scalar_one_or_none()
-    if not ev:
-        return None
-    if ev.used:
-        return None
-    if ev.expires_at < datetime.now(tz=timezone.utc):
+    # both kinds are accepted whatever the mode, so switching it doesn't void
+    # links already sent; table tokens are 32 hex chars, signed ones longer
+    if len(token) == 32:
+        user_id = await _claim_table_token(token, session)
+    else:
+        user_id = await _claim_signed_token(token)
+    if user_id is None:
         return None
 
-    # mark used and activate user
-    ev.used = True
-    user_statement = select(User).where(User.uuid == ev.user_id)
-    res = await session.execute(user_statement)
-    user = res.scalar_one_or_none()
+    result = await session.execute(
+        update(User)
+        .where(User.uuid == user_id)
+        .values(is_verified=True)
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
     if not user:
+        await session.rollback()
         return None
 
-    user.is_verified = True
     await session.commit()
-    await session.refresh(user)
+    await invalidate_principal(str(user.uuid))
     return user
+
+
+async def purge_verifications(
+    session: AsyncSession, batch_size: int = Config.VERIFICATION_PURGE_BATCH_SIZE
+) -> int:
+    """Delete used and expired table-mode tokens, one batch per transaction.
+
+    Short transactions keep locks brief, and SKIP LOCKED leaves alone rows a
+    verification is claiming right now. Returns how many rows went.
+    """
+    purged = 0
+    while True:
+        doomed = (
+            select(EmailVerification.token)
+            .where(
+                or_(
+                    EmailVerification.used.is_(True),
+                    EmailVerification.expires_at < datetime.now(tz=timezone.utc),
+                )
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(
+            delete(EmailVerification)
+            .where(EmailVerification.token.in_(doomed.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
@@ -0,0 +1,55 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from redis.asyncio import from_url
+from api.core.celery_app import celery_app
+from api.core.config import Config
+from api.core.storage import render_variants
+from api.database.models import Item, ItemImage
+import asyncio
+
+
+async def record_variants(digest: str, urls: dict[str, str]):
+    # asyncio.run() gives every task a fresh loop, so no pooled connections
+    from api.services.item import invalidate_items
+
+    engine = create_async_engine(Config.DATABASE_URL, poolclass=NullPool)
+    redis = from_url(Config.REDIS_URL, decode_responses=True)
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                update(ItemImage)
+                .where(ItemImage.sha256 == digest)
+                .values(
+                    thumbnail_url=urls.get("thumbnail"),
+                    medium_url=urls.get("medium"),
+                )
+                .returning(ItemImage.item_id)
+            )
+            item_ids = result.scalars().all()
+            if not item_ids:
+                return
+            result = await conn.execute(
+                update(Item)
+                .where(Item.id.in_(item_ids))
+                .values(version=Item.version + 1)
+                .returning(Item.owner_id)
+            )
+            owner_ids = set(result.scalars().all())
+
+        await invalidate_items(item_ids=item_ids, owner_ids=owner_ids, client=redis)
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+
+
+@celery_app.task(
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 3},
+)
+def process_image(digest: str, extension: str):
+    # runs in the prefork worker's process pool, off the API's event loop
+    urls = render_variants(digest, extension)
+    if urls:
+        asyncio.run(record_variants(digest, urls))
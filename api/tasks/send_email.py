@@ -1,29 +1,37 @@
-from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
+from aiosmtplib import SMTPException
+from celery.signals import worker_process_shutdown
 from api.core.celery_app import celery_app
 from api.core.config import Config
+from api.core.mailer import build_message, deliver, run_in_mail_loop, shutdown
+from api.database import async_session
+from api.services.outbox import drain_outbox
 import asyncio
 
 
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=Config.MAIL_USERNAME,
-    MAIL_PASSWORD=Config.MAIL_PASSWORD,  # type: ignore
-    MAIL_PORT=Config.MAIL_PORT,
-    MAIL_SERVER=Config.MAIL_SERVER,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    MAIL_FROM=Config.MAIL_FROM,
-)
+@worker_process_shutdown.connect
+def close_smtp_pool(**kwargs):
+    # QUIT the pooled sessions instead of dropping them mid-conversation
+    shutdown()
+
 
-mail = FastMail(mail_config)
+@celery_app.task(
+    autoretry_for=(SMTPException, OSError),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+)
+def send_verification_email(recipients: list[str], subject: str, body: str):
+    deliver(build_message(recipients, subject, body))
 
 
 @celery_app.task
-def send_verification_email(recipients: list[str], subject: str, body: str):
-    message = MessageSchema(
-        recipients=recipients,  # type: ignore
-        subject=subject,
-        body=body,
-        subtype=MessageType.html,
-    )
-
-    asyncio.run(mail.send_message(message))
+def dispatch_outbox():
+    # Runs on the mail loop, so the outbox rows go straight into the pooled
+    # SMTP sessions; overlapping runs are fine, SKIP LOCKED splits the work
+    async def drain(dispatcher):
+        async def send(row):
+            message = build_message(row.recipients, row.subject, row.body)
+            await asyncio.wait_for(dispatcher.send(message), Config.MAIL_SEND_TIMEOUT)
+
+        return await drain_outbox(async_session, send)
+
+    return run_in_mail_loop(drain)
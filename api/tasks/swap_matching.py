@@ -0,0 +1,104 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from redis.asyncio import from_url
+from api.core.celery_app import celery_app
+from api.core.config import Config
+from api.database.redis import SWAP_DIRTY_ITEMS, SWAP_DIRTY_USERS
+from api.services.swap import SwapService, TradeGraph
+from typing import Optional
+from uuid import UUID
+import asyncio
+import logging
+
+GENERATION_KEY = "swap:generation"
+LOCK_KEY = "swap:lock"
+
+
+class _MatcherState:
+    # Lives for the whole worker process so runs can be incremental. The
+    # generation counter in Redis tells us if another process ran in between,
+    # in which case our graph has missed dirty markers and is rebuilt.
+    graph: Optional[TradeGraph] = None
+    generation: int = -1
+    runs: int = 0
+
+
+state = _MatcherState()
+swap_service = SwapService()
+
+
+async def run_matching() -> dict:
+    # asyncio.run() gives every task a fresh loop, so pooled connections
+    # can't be shared between runs
+    engine = create_async_engine(Config.DATABASE_URL, poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    redis = from_url(Config.REDIS_URL, decode_responses=True)
+
+    lock = redis.lock(LOCK_KEY, timeout=Config.SWAP_MATCHING_INTERVAL_SECONDS * 5)
+    if not await lock.acquire(blocking=False):
+        await redis.aclose()
+        await engine.dispose()
+        return {"skipped": True}
+
+    try:
+        generation = int(await redis.get(GENERATION_KEY) or 0)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.smembers(SWAP_DIRTY_USERS)
+            pipe.smembers(SWAP_DIRTY_ITEMS)
+            pipe.delete(SWAP_DIRTY_USERS, SWAP_DIRTY_ITEMS)
+            dirty_users, dirty_items, _ = await pipe.execute()
+
+        full = (
+            state.graph is None
+            or state.generation != generation
+            or state.runs % Config.SWAP_FULL_REBUILD_EVERY == 0
+        )
+
+        async with session_factory() as session:
+            if full:
+                graph = await swap_service.load_graph(session)
+                freed = await swap_service.expire_invalid(graph, session)
+                starts = range(len(graph.users))
+            else:
+                graph = state.graph
+                changed = {UUID(u) for u in dirty_users}
+                if dirty_items:
+                    changed |= await swap_service.wishers_of(dirty_items, session)
+                if changed:
+                    await swap_service.reload_edges(graph, changed, session)
+                freed = await swap_service.expire_invalid(graph, session, changed)
+                starts = [graph.node(u) for u in changed | freed]
+                if len(graph.overlay) > len(graph.users) // 10:
+                    graph.compact()
+
+            blocked = {
+                graph.node(u) for u in await swap_service.pending_participants(session)
+            }
+            cycles = graph.find_cycles(
+                starts,
+                blocked,
+                Config.SWAP_MAX_CYCLE_LENGTH,
+                Config.SWAP_SEARCH_BUDGET,
+                await swap_service.rejected_cycles(graph, session),
+            )
+            await swap_service.save_suggestions(graph, cycles, session)
+            await session.commit()
+
+        await redis.set(GENERATION_KEY, generation + 1)
+        state.graph, state.generation = graph, generation + 1
+        state.runs += 1
+        return {"full": full, "users": len(graph.users), "cycles": len(cycles)}
+    except Exception:
+        # the dirty markers are gone, so only a full rebuild can catch up
+        state.graph = None
+        raise
+    finally:
+        await lock.release()
+        await redis.aclose()
+        await engine.dispose()
+
+
+@celery_app.task(soft_time_limit=300, time_limit=360)
+def find_trade_cycles():
+    result = asyncio.run(run_matching())
+    logging.info("swap matching: %s", result)
@@ -0,0 +1,24 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from api.core.celery_app import celery_app
+from api.core.config import Config
+from api.services.verification import purge_verifications
+import asyncio
+import logging
+
+
+async def run_purge() -> int:
+    # asyncio.run() gives every task a fresh loop, so no pooled connections
+    engine = create_async_engine(Config.DATABASE_URL, poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with session_factory() as session:
+            return await purge_verifications(session)
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(soft_time_limit=300, time_limit=360)
+def purge_verification_tokens():
+    purged = asyncio.run(run_purge())
+    logging.info("purged %d used or expired verification tokens", purged)
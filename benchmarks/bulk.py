@@ -0,0 +1,170 @@
+"""Streaming export / bulk import benchmark.
+
+Seeds --rows items, streams them back through GET /items/export and pushes
+--rows more through POST /items/import, reporting rows/s. Pass the PID of a
+(single) app process running on this host as --server-pid to also sample its
+RSS; it should stay flat regardless of --rows.
+
+    python -m benchmarks.bulk --rows 1000000 --server-pid $(pgrep -f uvicorn)
+"""
+
+from benchmarks.seed import PASSWORD, seed
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+from uuid import uuid4
+import argparse
+import asyncio
+import httpx
+import json
+import sys
+
+
+class RSSSampler:
+    def __init__(self, pid: Optional[int], interval: float = 0.2):
+        self.pid = pid
+        self.interval = interval
+        self.samples: list[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def read(self) -> Optional[int]:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    async def _run(self):
+        while True:
+            rss = self.read()
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task:
+            self._task.cancel()
+
+    def summary(self) -> Optional[dict]:
+        if not self.samples:
+            return None
+        mb = 1024 * 1024
+        return {
+            "rss_start_mb": round(self.samples[0] / mb, 1),
+            "rss_peak_mb": round(max(self.samples) / mb, 1),
+            "rss_end_mb": round(self.samples[-1] / mb, 1),
+        }
+
+
+async def export(client: httpx.AsyncClient, args, owner_id: str) -> dict:
+    rows = size = 0
+    start = perf_counter()
+    with RSSSampler(args.server_pid) as rss:
+        async with client.stream(
+            "GET",
+            "/items/export",
+            params={"format": args.format, "owner_id": owner_id},
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                rows += chunk.count(b"\n")
+    elapsed = perf_counter() - start
+
+    if args.format == "csv":
+        rows -= 1  # header
+    return {
+        "rows": rows,
+        "bytes": size,
+        "duration_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1),
+        "server": rss.summary(),
+    }
+
+
+async def import_body(rows: int, bad_every: int):
+    chunk: list[bytes] = []
+    for i in range(rows):
+        if bad_every and i % bad_every == bad_every - 1:
+            chunk.append(b'{"name": "missing description"}\n')
+        else:
+            line = {"name": f"imported {i}", "description": "bulk import benchmark"}
+            chunk.append(json.dumps(line).encode() + b"\n")
+        if len(chunk) == 1000:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+async def bulk_import(client: httpx.AsyncClient, args, token: str) -> dict:
+    start = perf_counter()
+    with RSSSampler(args.server_pid) as rss:
+        response = await client.post(
+            "/items/import",
+            content=import_body(args.rows, args.bad_every),
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/x-ndjson",
+            },
+        )
+        response.raise_for_status()
+    elapsed = perf_counter() - start
+
+    report = response.json()
+    return {
+        "rows": args.rows,
+        "inserted": report["inserted"],
+        "failed": report["failed"],
+        "duration_s": round(elapsed, 3),
+        "rows_per_s": round(args.rows / elapsed, 1),
+        "server": rss.summary(),
+    }
+
+
+async def main(args) -> dict:
+    run_id = uuid4().hex[:8]
+    data = await seed(run_id, 1, args.rows)
+    user = data["users"][0]
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        response = await client.post(
+            "/auth/login", json={"email": user["email"], "password": PASSWORD}
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        results = {
+            "export": await export(client, args, user["uuid"]),
+            "import": await bulk_import(client, args, token),
+        }
+
+    return {
+        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+        "run_id": run_id,
+        "params": vars(args),
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--bad-every", type=int, default=10000, help="0 = none")
+    parser.add_argument("--server-pid", type=int)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
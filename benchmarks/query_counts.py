@@ -0,0 +1,97 @@
+"""Statement counts for the single-round-trip write paths.
+
+Runs each ItemService/AuthService mutation against the configured database
+and Redis, counts the SQL statements it sends (COMMIT aside) and prints JSON.
+Exits non-zero if any write takes more statements than budgeted: one, except
+for registration, which also writes its verification token and email.
+
+    python -m benchmarks.query_counts
+"""
+
+from api.core.config import Config
+from api.database import async_session
+from api.database.main import async_engine
+from api.schemas import UserCreate
+from api.schemas.item import ItemCreate, ItemUpdate
+from api.services import AuthService, ItemService
+from benchmarks.seed import PASSWORD
+from contextlib import contextmanager
+from sqlalchemy import event
+from uuid import uuid4
+import asyncio
+import json
+import sys
+
+
+@contextmanager
+def count_statements():
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def main() -> dict:
+    auth_service, item_service = AuthService(), ItemService()
+    run_id = uuid4().hex[:8]
+    counts, over_budget = {}, []
+
+    async def measure(name: str, write, budget: int = 1):
+        async with async_session() as session:
+            with count_statements() as statements:
+                result = await write(session)
+        counts[name] = len(statements)
+        if len(statements) > budget:
+            over_budget.append(name)
+        return result
+
+    user = await measure(
+        "register_user",
+        lambda s: auth_service.register_user(
+            UserCreate(
+                email=f"bench-{run_id}@example.com",
+                username=f"bench-{run_id}",
+                password1=PASSWORD,
+                password2=PASSWORD,
+            ),
+            s,
+        ),
+        # signed verification tokens have no row
+        budget=3 if Config.VERIFICATION_TOKEN_MODE == "table" else 2,
+    )
+    user_id = str(user.uuid)
+    item = await measure(
+        "create_item",
+        lambda s: item_service.create_item(
+            user_id, ItemCreate(name="counted", description="counted"), s
+        ),
+    )
+    await measure(
+        "update_item",
+        lambda s: item_service.update_item(
+            str(item.id), user_id, ItemUpdate(name="recounted"), s
+        ),
+    )
+    await measure(
+        "delete_item",
+        lambda s: item_service.delete_item(str(item.id), user_id, s),
+    )
+    await measure(
+        "deactivate_user_account",
+        lambda s: auth_service.deactivate_user_account(user_id, s),
+    )
+
+    return {"statements": counts, "ok": not over_budget}
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main())
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+    sys.exit(0 if report["ok"] else 1)
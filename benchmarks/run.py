@@ -0,0 +1,401 @@
+"""Reproducible load benchmark for the API.
+
+Seeds users and items straight into the configured database, then drives a
+running app (one or more uvicorn processes sharing Postgres and Redis) and
+prints machine-readable JSON with RPS, p50/p95/p99 and error rates per
+scenario, tagged with the current git commit so runs can be compared.
+
+    python -m benchmarks.run --base-url http://localhost:8000 \\
+        --base-url http://localhost:8001 --users 200 --items 10000 \\
+        --duration 20 --concurrency 50 --output bench.json
+
+Passing several --base-url values spreads clients (and the two ends of every
+chat pair) across app processes, which exercises cross-node chat delivery.
+
+Every client runs from the same IP, so start the app processes with
+RATE_LIMIT_ENABLED=false or the login/register limits throttle the run.
+"""
+
+from benchmarks.seed import PASSWORD, seed
+from benchmarks.stats import ScenarioStats
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Awaitable, Callable
+from uuid import uuid4
+import argparse
+import asyncio
+import httpx
+import json
+import random
+import subprocess
+import sys
+import websockets
+
+
+SCENARIOS = (
+    "register",
+    "login",
+    "me",
+    "list_items",
+    "update_item",
+    "chat",
+    "login_storm",
+    "exchange_accept",
+)
+
+
+class Bench:
+    def __init__(self, args, data: dict):
+        self.args = args
+        self.data = data
+        self.clients = [
+            httpx.AsyncClient(
+                base_url=url,
+                timeout=30,
+                limits=httpx.Limits(max_connections=args.concurrency),
+            )
+            for url in args.base_url
+        ]
+        self.tokens: dict[str, str] = {}
+
+    def client(self, worker: int) -> httpx.AsyncClient:
+        return self.clients[worker % len(self.clients)]
+
+    async def close(self):
+        for client in self.clients:
+            await client.aclose()
+
+    async def drive(
+        self,
+        name: str,
+        request: Callable[[httpx.AsyncClient, int], Awaitable[bool]],
+        concurrency: int,
+    ) -> ScenarioStats:
+        stats = ScenarioStats(name)
+        deadline = perf_counter() + self.args.duration
+
+        async def worker(index: int):
+            client = self.client(index)
+            while perf_counter() < deadline:
+                start = perf_counter()
+                try:
+                    ok = await request(client, index)
+                except httpx.HTTPError:
+                    ok = False
+                stats.record(perf_counter() - start, ok)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        stats.finish()
+        return stats
+
+    async def login(self, client: httpx.AsyncClient, email: str) -> httpx.Response:
+        return await client.post(
+            "/auth/login", json={"email": email, "password": PASSWORD}
+        )
+
+    async def prepare_tokens(self):
+        # bcrypt-bound, so only log in as many users as the scenarios need
+        needed = max(self.args.concurrency, 2 * self.args.chat_pairs)
+        users = self.data["users"][:needed]
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def login_one(index: int, user: dict):
+            async with semaphore:
+                response = await self.login(self.client(index), user["email"])
+                response.raise_for_status()
+                self.tokens[user["uuid"]] = response.json()["access_token"]
+
+        await asyncio.gather(*(login_one(i, u) for i, u in enumerate(users)))
+
+    def headers(self, user_id: str) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    # scenarios
+
+    async def scenario_login(self) -> dict:
+        users = self.data["users"]
+
+        async def request(client, worker):
+            response = await self.login(client, random.choice(users)["email"])
+            return response.status_code == 200
+
+        stats = await self.drive("login", request, self.args.concurrency)
+        return {"login": stats.summary()}
+
+    async def scenario_register(self) -> dict:
+        async def request(client, worker):
+            name = f"bench-reg-{uuid4().hex}"
+            response = await client.post(
+                "/auth/register",
+                json={
+                    "email": f"{name}@example.com",
+                    "username": name,
+                    "password1": PASSWORD,
+                    "password2": PASSWORD,
+                },
+            )
+            return response.status_code == 201
+
+        stats = await self.drive("register", request, self.args.concurrency)
+        return {"register": stats.summary()}
+
+    async def scenario_me(self) -> dict:
+        user_ids = list(self.tokens)
+
+        async def request(client, worker):
+            user_id = user_ids[worker % len(user_ids)]
+            response = await client.get("/auth/me", headers=self.headers(user_id))
+            return response.status_code == 200
+
+        stats = await self.drive("me", request, self.args.concurrency)
+        return {"me": stats.summary()}
+
+    def list_items_request(self):
+        cursors: dict[int, str | None] = {}
+
+        async def request(client, worker):
+            # walk the catalog page by page, starting over at the end
+            params = {"limit": self.args.page_size}
+            if cursors.get(worker):
+                params["cursor"] = cursors[worker]
+            response = await client.get("/items/", params=params)
+            if response.status_code != 200:
+                return False
+            cursors[worker] = response.json().get("next_cursor")
+            return True
+
+        return request
+
+    async def scenario_list_items(self) -> dict:
+        stats = await self.drive(
+            "list_items", self.list_items_request(), self.args.concurrency
+        )
+        return {"list_items": stats.summary()}
+
+    async def scenario_update_item(self) -> dict:
+        owners = [
+            (user_id, items)
+            for user_id, items in self.data["items_by_owner"].items()
+            if user_id in self.tokens
+        ]
+        if not owners:
+            return {}
+
+        async def request(client, worker):
+            user_id, items = owners[worker % len(owners)]
+            response = await client.put(
+                f"/items/{random.choice(items)}",
+                json={"name": f"renamed {uuid4().hex[:8]}"},
+                headers=self.headers(user_id),
+            )
+            return response.status_code == 200
+
+        stats = await self.drive("update_item", request, self.args.concurrency)
+        return {"update_item": stats.summary()}
+
+    async def scenario_login_storm(self) -> dict:
+        # p99 of an unrelated endpoint while logins saturate the hash pool
+        users = self.data["users"]
+
+        async def login(client, worker):
+            response = await self.login(client, random.choice(users)["email"])
+            return response.status_code == 200
+
+        storm, probe = await asyncio.gather(
+            self.drive("login_storm", login, self.args.concurrency),
+            self.drive("login_storm_probe", self.list_items_request(), 4),
+        )
+        return {"login_storm": storm.summary(), "login_storm_probe": probe.summary()}
+
+    async def scenario_exchange_accept(self) -> dict:
+        # Many offers for the same few items, all accepted at once: exactly one
+        # accept per target item may win, the rest must lose cleanly (409, or
+        # 404 once the winner has auto-rejected the other pending offers)
+        owners = [
+            (user_id, items)
+            for user_id, items in self.data["items_by_owner"].items()
+            if user_id in self.tokens
+        ]
+        targets = owners[: self.args.exchange_targets]
+        proposers = owners[self.args.exchange_targets :]
+        if not targets or not proposers:
+            return {}
+
+        offers = []
+        client = self.client(0)
+        for target_owner, target_items in targets:
+            for proposer, proposer_items in proposers:
+                response = await client.post(
+                    "/exchanges/",
+                    json={
+                        "item_from_id": random.choice(proposer_items),
+                        "item_to_id": target_items[0],
+                    },
+                    headers=self.headers(proposer),
+                )
+                if response.status_code == 201:
+                    exchange_id = response.json()["id"]
+                    offers.append((target_owner, target_items[0], exchange_id))
+
+        stats = ScenarioStats("exchange_accept")
+        outcomes: dict[str, list[int]] = {}
+
+        async def accept(index: int, owner: str, item_id: str, exchange_id: str):
+            start = perf_counter()
+            try:
+                response = await self.client(index).post(
+                    f"/exchanges/{exchange_id}/accept", headers=self.headers(owner)
+                )
+            except httpx.HTTPError:
+                stats.record(perf_counter() - start, ok=False)
+                return
+            ok = response.status_code in (200, 404, 409)
+            stats.record(perf_counter() - start, ok)
+            outcomes.setdefault(item_id, []).append(response.status_code)
+
+        await asyncio.gather(*(accept(i, *offer) for i, offer in enumerate(offers)))
+        stats.finish()
+
+        summary = stats.summary()
+        summary.update(
+            {
+                "competing_accepts": len(offers),
+                "accepted": sum(codes.count(200) for codes in outcomes.values()),
+                "lost_race": sum(
+                    codes.count(404) + codes.count(409) for codes in outcomes.values()
+                ),
+                "double_booked": sum(
+                    1 for codes in outcomes.values() if codes.count(200) > 1
+                ),
+            }
+        )
+        return {"exchange_accept": summary}
+
+    async def scenario_chat(self) -> dict:
+        user_ids = list(self.tokens)
+        pairs = [
+            (user_ids[2 * i], user_ids[2 * i + 1])
+            for i in range(min(self.args.chat_pairs, len(user_ids) // 2))
+        ]
+        stats = ScenarioStats("chat")
+        sent = 0
+        deadline = perf_counter() + self.args.duration
+        interval = 1 / self.args.chat_rate
+
+        def ws_url(index: int, user_id: str) -> str:
+            base = self.args.base_url[index % len(self.args.base_url)]
+            base = base.replace("http://", "ws://").replace("https://", "wss://")
+            return f"{base}/ws/chat/?token={self.tokens[user_id]}"
+
+        async def receive(ws, user_id: str):
+            try:
+                async for raw in ws:
+                    message = json.loads(raw)
+                    if message.get("recipient_id") == user_id:
+                        stats.record(perf_counter() - float(message["content"]))
+            except websockets.ConnectionClosed:
+                pass
+
+        async def session(index: int, sender: str, recipient: str):
+            nonlocal sent
+            # the two ends of a pair land on different app processes
+            async with (
+                websockets.connect(ws_url(index, sender)) as sender_ws,
+                websockets.connect(ws_url(index + 1, recipient)) as recipient_ws,
+            ):
+                receiver = asyncio.create_task(receive(recipient_ws, recipient))
+                while perf_counter() < deadline:
+                    payload = {
+                        "recipient_id": recipient,
+                        "content": str(perf_counter()),
+                    }
+                    try:
+                        await sender_ws.send(json.dumps(payload))
+                        sent += 1
+                    except websockets.ConnectionClosed:
+                        stats.record(0, ok=False)
+                        break
+                    await asyncio.sleep(interval)
+                # give in-flight messages a moment to arrive
+                await asyncio.sleep(1)
+                receiver.cancel()
+
+        await asyncio.gather(*(session(i, a, b) for i, (a, b) in enumerate(pairs)))
+        stats.finish()
+
+        summary = stats.summary()
+        delivered = len(stats.latencies)
+        summary.update(
+            {
+                "sessions": len(pairs) * 2,
+                "sent": sent,
+                "delivered": delivered,
+                "lost": max(sent - delivered, 0),
+                "delivered_per_s": round(delivered / summary["duration_s"], 2),
+            }
+        )
+        return {"chat": summary}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args) -> dict:
+    run_id = uuid4().hex[:8]
+    data = await seed(run_id, args.users, args.items)
+
+    bench = Bench(args, data)
+    results = {}
+    try:
+        await bench.prepare_tokens()
+        for name in args.scenario:
+            results.update(await getattr(bench, f"scenario_{name}")())
+    finally:
+        await bench.close()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+        "run_id": run_id,
+        "params": {
+            k: v for k, v in vars(args).items() if k not in ("output", "scenario")
+        },
+        "scenarios": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", action="append", default=[])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--chat-pairs", type=int, default=50)
+    parser.add_argument("--chat-rate", type=float, default=10, help="msgs/s/session")
+    parser.add_argument("--exchange-targets", type=int, default=5)
+    parser.add_argument(
+        "--scenario", action="append", choices=SCENARIOS, help="default: all"
+    )
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    args.base_url = args.base_url or ["http://localhost:8000"]
+    args.scenario = args.scenario or list(SCENARIOS)
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = json.dumps(asyncio.run(main(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
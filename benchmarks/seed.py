@@ -0,0 +1,54 @@
+from sqlalchemy import insert
+from api.core.security.utils import hash_password
+from api.database import async_session
+from api.database.models import Item, User
+from uuid import uuid4
+
+PASSWORD = "bench-password"
+
+
+async def seed(run_id: str, users: int, items: int) -> dict:
+    """Bulk-insert verified users and their items for one benchmark run.
+
+    Rows are namespaced by run_id, so repeated runs never collide.
+    """
+    hashed = hash_password(PASSWORD)  # one hash, shared by every seeded user
+    user_rows = [
+        {
+            "uuid": uuid4(),
+            "email": f"bench-{run_id}-{i}@example.com",
+            "username": f"bench-{run_id}-{i}",
+            "hashed_password": hashed,
+            "is_active": True,
+            "is_verified": True,
+        }
+        for i in range(users)
+    ]
+    item_rows = [
+        {
+            "id": uuid4(),
+            "name": f"bench item {i}",
+            "description": f"seeded for benchmark run {run_id}",
+            "owner_id": user_rows[i % users]["uuid"],
+            "is_available": True,
+        }
+        for i in range(items)
+    ]
+
+    async with async_session() as session:
+        for start in range(0, len(user_rows), 1000):
+            await session.execute(insert(User), user_rows[start : start + 1000])
+        for start in range(0, len(item_rows), 1000):
+            await session.execute(insert(Item), item_rows[start : start + 1000])
+        await session.commit()
+
+    items_by_owner: dict[str, list[str]] = {}
+    for row in item_rows:
+        items_by_owner.setdefault(str(row["owner_id"]), []).append(str(row["id"]))
+
+    return {
+        "users": [
+            {"uuid": str(row["uuid"]), "email": row["email"]} for row in user_rows
+        ],
+        "items_by_owner": items_by_owner,
+    }
@@ -0,0 +1,134 @@
+"""CPU per request for item list rendering, ORM/jsonable path vs pre-rendered.
+
+Builds one --items page in memory (no database or Redis) and serves it from
+two throwaway in-process routes shaped like GET /items/ before and after the
+switch to pre-rendered pages:
+
+- orm: ItemRead dicts dumped from ORM objects, returned through
+  response_model=ItemPage, so FastAPI validates and encodes them per request
+- rows: column rows rendered once by pydantic-core into the page body, served
+  as-is
+
+Each is measured on a cache miss (render from objects/rows) and on a cache
+hit (decode the cached JSON and respond), reporting process CPU ms/request.
+
+    python -m benchmarks.serialization --items 10000 --requests 50
+"""
+
+from api.database.models import Item, ItemImage
+from api.schemas.item import ItemPage
+from api.services.item import _dump, _render_page
+from datetime import datetime, timezone
+from fastapi import FastAPI, Response
+from sqlalchemy.orm.attributes import set_committed_value
+from time import process_time
+from uuid import uuid4
+import argparse
+import asyncio
+import httpx
+import json
+import sys
+
+
+def build_page(count: int, images_every: int) -> tuple[list[Item], list[dict]]:
+    now = datetime.now(tz=timezone.utc)
+    owner_id = uuid4()
+    items, rows = [], []
+    for i in range(count):
+        row = {
+            "id": uuid4(),
+            "name": f"item {i}",
+            "description": "a reasonably sized description " * 4,
+            "owner_id": owner_id,
+            "is_available": i % 3 != 0,
+            "version": 1 + i % 5,
+            "updated_at": now,
+        }
+        images = []
+        if images_every and i % images_every == 0:
+            image_id = uuid4()
+            images.append(
+                {
+                    "id": image_id,
+                    "image_url": f"/media/originals/ab/{image_id.hex}.jpg",
+                    "thumbnail_url": f"/media/variants/ab/{image_id.hex}_thumb.webp",
+                    "medium_url": None,
+                }
+            )
+        rows.append({**row, "images": images})
+
+        item = Item(**row)
+        set_committed_value(item, "images", [ItemImage(**image) for image in images])
+        items.append(item)
+    return items, rows
+
+
+def build_app(items: list[Item], rows: list[dict]) -> FastAPI:
+    app = FastAPI()
+    # what the cache would hold for each path
+    cached_orm = json.dumps({"items": [_dump(i) for i in items], "next_cursor": None})
+    cached_rows = json.dumps({"body": _render_page(rows, None)})
+
+    @app.get("/orm/miss", response_model=ItemPage)
+    async def orm_miss():
+        return {"items": [_dump(i) for i in items], "next_cursor": None}
+
+    @app.get("/orm/hit", response_model=ItemPage)
+    async def orm_hit():
+        return json.loads(cached_orm)
+
+    @app.get("/rows/miss", response_model=ItemPage)
+    async def rows_miss():
+        return Response(_render_page(rows, None), media_type="application/json")
+
+    @app.get("/rows/hit", response_model=ItemPage)
+    async def rows_hit():
+        page = json.loads(cached_rows)
+        return Response(page["body"], media_type="application/json")
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> dict:
+    response = await client.get(path)  # warm-up, also checks the output
+    response.raise_for_status()
+    size = len(response.content)
+
+    start = process_time()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    cpu = (process_time() - start) / requests
+    return {"cpu_ms_per_request": round(cpu * 1000, 2), "bytes": size}
+
+
+async def main(args) -> dict:
+    items, rows = build_page(args.items, args.images_every)
+    app = build_app(items, rows)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://b") as client:
+        for path in ("orm", "rows"):
+            for case in ("miss", "hit"):
+                results[f"{path}_{case}"] = await measure(
+                    client, f"/{path}/{case}", args.requests
+                )
+
+    for case in ("miss", "hit"):
+        before = results[f"orm_{case}"]["cpu_ms_per_request"]
+        after = results[f"rows_{case}"]["cpu_ms_per_request"]
+        results[f"speedup_{case}"] = round(before / after, 1) if after else None
+    return {"params": vars(args), "results": results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--images-every", type=int, default=3, help="0 = none")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
@@ -0,0 +1,142 @@
+"""Email delivery throughput against a local stand-in SMTP server.
+
+Starts a minimal in-process SMTP server (optionally with artificial per-command
+and handshake latency to mimic a remote provider) and compares the old
+connection-per-email delivery with the pooled MailDispatcher, in emails/s.
+
+    python -m benchmarks.smtp --emails 2000 --latency-ms 5 --handshake-ms 50
+"""
+
+from aiosmtplib import SMTP
+from api.core.mailer import MailDispatcher, build_message
+from time import perf_counter
+import argparse
+import asyncio
+import json
+import sys
+
+
+class StandInSMTP:
+    """Accepts everything, stores nothing; just enough SMTP for aiosmtplib."""
+
+    def __init__(self, latency: float, handshake: float):
+        self.latency = latency
+        self.handshake = handshake
+        self.received = 0
+        self.sessions = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake)
+        writer.write(b"220 stand-in ESMTP\r\n")
+        in_data = False
+        while line := await reader.readline():
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.received += 1
+                    writer.write(b"250 queued\r\n")
+                continue
+
+            await asyncio.sleep(self.latency)
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-stand-in\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                in_data = True
+                writer.write(b"354 go ahead\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def messages(count: int):
+    return [
+        build_message([f"bench-{i}@example.com"], "Verify your email", "<p>hi</p>")
+        for i in range(count)
+    ]
+
+
+async def per_email(port: int, count: int, concurrency: int) -> float:
+    # what the old task did: one fresh session per email
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(message):
+        async with semaphore:
+            smtp = SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await smtp.connect()
+            await smtp.send_message(message)
+            await smtp.quit()
+
+    start = perf_counter()
+    await asyncio.gather(*(send(m) for m in messages(count)))
+    return perf_counter() - start
+
+
+async def pooled(port: int, count: int, args) -> float:
+    dispatcher = MailDispatcher(
+        hostname="127.0.0.1",
+        port=port,
+        username=None,
+        password=None,
+        use_tls=False,
+        start_tls=False,
+        pool_size=args.pool_size,
+        batch_size=args.batch_size,
+        max_per_connection=args.max_per_connection,
+        rate_per_second=args.rate,
+    )
+    await dispatcher.start()
+    start = perf_counter()
+    try:
+        await asyncio.gather(*(dispatcher.send(m) for m in messages(count)))
+        return perf_counter() - start
+    finally:
+        await dispatcher.stop()
+
+
+async def main(args) -> dict:
+    results = {}
+    for name in ("per_email", "pooled"):
+        server = StandInSMTP(args.latency_ms / 1000, args.handshake_ms / 1000)
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            if name == "per_email":
+                elapsed = await per_email(port, args.emails, args.pool_size)
+            else:
+                elapsed = await pooled(port, args.emails, args)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+
+        results[name] = {
+            "emails": args.emails,
+            "delivered": server.received,
+            "smtp_sessions": server.sessions,
+            "duration_s": round(elapsed, 3),
+            "emails_per_s": round(server.received / elapsed, 1),
+        }
+    return {"params": vars(args), "results": results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=2)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-per-connection", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0, help="emails/s, 0 = off")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    report = asyncio.run(main(parse_args()))
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
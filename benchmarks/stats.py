@@ -0,0 +1,42 @@
+from dataclasses import dataclass, field
+from time import perf_counter
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+@dataclass
+class ScenarioStats:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    started: float = field(default_factory=perf_counter)
+    finished: float = 0.0
+
+    def record(self, seconds: float, ok: bool = True):
+        if ok:
+            self.latencies.append(seconds)
+        else:
+            self.errors += 1
+
+    def finish(self):
+        self.finished = perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = (self.finished or perf_counter()) - self.started
+        total = len(self.latencies) + self.errors
+        values = sorted(self.latencies)
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": self.errors / total if total else 0.0,
+            "duration_s": round(elapsed, 3),
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
@@ -0,0 +1,79 @@
+"""Fixtures for tests that run against the configured Postgres and Redis.
+
+Everything runs on one event loop for the whole session: the app's engine
+and Redis client pool their connections on the loop that opened them.
+
+    poetry run pytest
+"""
+
+from sqlalchemy import delete, event, insert, or_
+from api.database.main import async_engine, async_session
+from api.database.models import Conversation, Item, Message, User
+from uuid import uuid4
+import asyncio
+import pytest
+
+
+@pytest.fixture(scope="session")
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(async_engine.dispose())
+    loop.close()
+
+
+@pytest.fixture
+def session(run):
+    session = async_session()
+    yield session
+    run(session.close())
+
+
+@pytest.fixture
+def user_id(run):
+    user_id = uuid4()
+
+    async def create():
+        async with async_session() as session:
+            await session.execute(
+                insert(User).values(
+                    uuid=user_id,
+                    email=f"{user_id.hex}@example.com",
+                    username=user_id.hex,
+                    hashed_password="x",
+                    is_verified=True,
+                )
+            )
+            await session.commit()
+
+    async def remove():
+        async with async_session() as session:
+            conversations = or_(
+                Conversation.user_id == user_id, Conversation.peer_id == user_id
+            )
+            await session.execute(delete(Conversation).where(conversations))
+            messages = or_(
+                Message.sender_id == user_id, Message.recipient_id == user_id
+            )
+            await session.execute(delete(Message).where(messages))
+            await session.execute(delete(Item).where(Item.owner_id == user_id))
+            await session.execute(delete(User).where(User.uuid == user_id))
+            await session.commit()
+
+    run(create())
+    yield str(user_id)
+    run(remove())
+
+
+@pytest.fixture
+def statements():
+    """SQL statements sent to the database while the test runs."""
+    log = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        log.append(statement)
+
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield log
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from sqlalchemy import select
+from api.database.models import Message
+from api.services.chat import MessageWriter
+from uuid import UUID, uuid4
+import asyncio
+
+
+def message(user_id: str, content) -> dict:
+    return {
+        "id": uuid4(),
+        "sender_id": UUID(user_id),
+        "recipient_id": UUID(user_id),
+        "item_id": None,
+        "content": content,
+        "created_at": datetime.now(tz=timezone.utc),
+    }
+
+
+def stored(run, session, rows: list[dict]) -> set:
+    result = run(
+        session.execute(
+            select(Message.id).where(Message.id.in_([row["id"] for row in rows]))
+        )
+    )
+    return set(result.scalars().all())
+
+
+def test_bad_row_does_not_sink_its_batch(run, session, user_id):
+    batch = [
+        message(user_id, "first"),
+        message(user_id, {"x": 1}),  # not text
+        message(user_id, "nul \x00 byte"),  # text Postgres won't store
+        message(user_id, "last"),
+    ]
+    run(MessageWriter()._flush(batch))
+
+    assert stored(run, session, batch) == {batch[0]["id"], batch[3]["id"]}
+
+
+def test_flusher_survives_a_failed_flush(run, session, user_id):
+    writer = MessageWriter()
+    flush = writer._flush
+    failures = []
+
+    async def failing_once(batch):
+        if not failures:
+            failures.append(batch)
+            raise RuntimeError("flush blew up")
+        await flush(batch)
+
+    writer._flush = failing_once
+    run(writer.start())
+    lost, kept = message(user_id, "lost"), message(user_id, "kept")
+
+    run(writer.submit(lost))
+    run(asyncio.sleep(0.5))
+    run(writer.submit(kept))
+    run(asyncio.sleep(0.5))
+    run(writer.stop())
+
+    assert failures == [[lost]]
+    assert stored(run, session, [lost, kept]) == {kept["id"]}
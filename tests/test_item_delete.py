@@ -0,0 +1,65 @@
+from sqlalchemy import insert, select
+from api.database.models import ExchangeRequest, Message
+from api.schemas.item import ItemCreate
+from api.services.item import ItemService
+
+item_service = ItemService()
+
+# An item referenced from other tables can still be deleted by its owner.
+
+
+def new_item(run, session, user_id):
+    data = ItemCreate(name="lamp", description="desk lamp")
+    return run(item_service.create_item(user_id, data, session))
+
+
+def test_delete_item_in_exchange_request(run, session, user_id):
+    offered = new_item(run, session, user_id)
+    wanted = new_item(run, session, user_id)
+    result = run(
+        session.execute(
+            insert(ExchangeRequest)
+            .values(
+                from_user_id=user_id,
+                to_user_id=user_id,
+                item_from_id=offered.id,
+                item_to_id=wanted.id,
+            )
+            .returning(ExchangeRequest.id)
+        )
+    )
+    exchange_id = result.scalar_one()
+    run(session.commit())
+
+    assert run(item_service.delete_item(str(wanted.id), user_id, session))
+    result = run(
+        session.execute(
+            select(ExchangeRequest.id).where(ExchangeRequest.id == exchange_id)
+        )
+    )
+    assert result.scalar_one_or_none() is None
+
+
+def test_delete_item_mentioned_in_chat(run, session, user_id):
+    item = new_item(run, session, user_id)
+    result = run(
+        session.execute(
+            insert(Message)
+            .values(
+                sender_id=user_id,
+                recipient_id=user_id,
+                item_id=item.id,
+                content="is the lamp still there?",
+            )
+            .returning(Message.id)
+        )
+    )
+    message_id = result.scalar_one()
+    run(session.commit())
+
+    assert run(item_service.delete_item(str(item.id), user_id, session))
+    result = run(
+        session.execute(select(Message.item_id).where(Message.id == message_id))
+    )
+    # the message stays, it just no longer points at anything
+    assert result.one() == (None,)
@@ -0,0 +1,95 @@
+from sqlalchemy import delete, insert
+from api.core.config import Config
+from api.database.models import EmailOutbox, User, WishlistItem
+from api.database.redis import SWAP_DIRTY_USERS, redis
+from api.schemas.item import ItemCreate, ItemUpdate
+from api.schemas.user import UserCreate
+from api.services.auth import AuthService
+from api.services.item import ItemService
+from uuid import uuid4
+
+item_service = ItemService()
+auth_service = AuthService()
+
+# Every write is one statement; only a write that matches nothing pays for
+# the ownership lookup that tells 404 from 403.
+
+
+def new_item(run, session, user_id):
+    data = ItemCreate(name="lamp", description="desk lamp")
+    return run(item_service.create_item(user_id, data, session))
+
+
+def test_create_item(run, session, user_id, statements):
+    new_item(run, session, user_id)
+    assert len(statements) == 1
+
+
+def test_update_item(run, session, user_id, statements):
+    item = new_item(run, session, user_id)
+    statements.clear()
+
+    data = ItemUpdate(name="lamp, green")
+    run(item_service.update_item(str(item.id), user_id, data, session))
+    assert len(statements) == 1
+
+
+def test_delete_item(run, session, user_id, statements):
+    item = new_item(run, session, user_id)
+    statements.clear()
+
+    assert run(item_service.delete_item(str(item.id), user_id, session))
+    assert len(statements) == 1
+
+
+def test_delete_item_marks_wishers_dirty(run, session, user_id, statements):
+    item = new_item(run, session, user_id)
+    run(session.execute(insert(WishlistItem).values(user_id=user_id, item_id=item.id)))
+    run(session.commit())
+    run(redis.srem(SWAP_DIRTY_USERS, user_id))
+    statements.clear()
+
+    # the cascade has removed the wishlist row by the time the delete returns
+    assert run(item_service.delete_item(str(item.id), user_id, session))
+    assert len(statements) == 1
+    assert run(redis.sismember(SWAP_DIRTY_USERS, user_id))
+
+
+def test_delete_someone_elses_item(run, session, user_id, statements):
+    item = new_item(run, session, user_id)
+    statements.clear()
+
+    stranger = str(uuid4())
+    assert run(item_service.delete_item(str(item.id), stranger, session)) is False
+    assert len(statements) == 2
+
+
+def test_register_user(run, session, statements):
+    name = uuid4().hex
+    data = UserCreate(
+        email=f"{name}@example.com",
+        username=name,
+        password1="password",
+        password2="password",
+    )
+    user = run(auth_service.register_user(data, session))
+    # the user, its verification token (table mode only) and the email,
+    # all in one transaction
+    table_mode = Config.VERIFICATION_TOKEN_MODE == "table"
+    assert len(statements) == 2 + table_mode
+
+    outbox = EmailOutbox.recipients.any(user.email)
+    run(session.execute(delete(EmailOutbox).where(outbox)))
+    run(session.execute(delete(User).where(User.uuid == user.uuid)))
+    run(session.commit())
+
+
+def test_update_password_hash(run, session, user_id, statements):
+    user = User(uuid=user_id)
+    run(auth_service.update_password_hash(user, "y", session))
+    assert len(statements) == 1
+
+
+def test_deactivate_user_account(run, session, user_id, statements):
+    assert run(auth_service.deactivate_user_account(user_id, session))
+    assert len(statements) == 1
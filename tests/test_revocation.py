@@ -0,0 +1,45 @@
+from api.core.revocation import RevocationFilter
+from api.database.redis import invalidate_principal, revoke_user_sessions
+import asyncio
+import pytest
+
+PRINCIPAL = {"is_active": True, "is_verified": True, "valid_after": 0}
+
+
+@pytest.fixture
+def node(run):
+    node = RevocationFilter()
+    run(node.start())
+    yield node
+    run(node.stop())
+
+
+def settle(run):
+    # let the listener pick up what was just published
+    run(asyncio.sleep(0.5))
+
+
+def test_principal_dropped_when_invalidated(run, node, user_id):
+    node.remember_principal(user_id, PRINCIPAL, node.principal_events)
+    assert node.get_principal(user_id) == PRINCIPAL
+
+    run(invalidate_principal(user_id))
+    settle(run)
+    assert node.get_principal(user_id) is None
+
+
+def test_principal_dropped_when_sessions_revoked(run, node, user_id):
+    node.remember_principal(user_id, PRINCIPAL, node.principal_events)
+
+    run(revoke_user_sessions(user_id, False, True, 0))
+    settle(run)
+    assert node.get_principal(user_id) is None
+
+
+def test_read_that_raced_a_change_is_not_kept(run, node, user_id):
+    seen = node.principal_events
+    run(invalidate_principal(user_id))
+    settle(run)
+
+    node.remember_principal(user_id, PRINCIPAL, seen)
+    assert node.get_principal(user_id) is None